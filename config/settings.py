@@ -49,10 +49,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'services.middleware.TenantMiddleware',
+    'services.middleware.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'services.middleware.ThrottleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -82,6 +85,12 @@ LOGIN_REDIRECT_URL = '/'
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Resolve URLs, compile templates, open DB connections and prime the catalog cache
+# when a worker starts, before it accepts traffic (see services/warmup.py).
+# Disable it for servers that fork after loading the app (e.g. gunicorn --preload),
+# otherwise the opened connections would be shared between workers.
+WARMUP_ON_STARTUP = os.getenv('WARMUP_ON_STARTUP', 'True') == 'True'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
@@ -90,6 +99,68 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests so the warm-up's connection is reused.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Each salon's data lives in the database named by Salon.db_alias. Aliases that are
+# not listed in DATABASES are created as SQLite files in TENANT_DATABASE_DIR.
+DATABASE_ROUTERS = ['services.routers.TenantRouter', 'services.routers.ReplicaRouter']
+
+TENANT_DATABASE_DIR = Path(os.getenv('TENANT_DATABASE_DIR', BASE_DIR / 'tenant_databases'))
+
+# Once a salon exists, requests that resolve no salon get a 404 instead of seeing every
+# salon's rows, except under TENANT_EXEMPT_PATHS. Set TENANT_ALLOW_UNRESOLVED to serve
+# them without a tenant anyway. Rows created before the first salon belong to no salon:
+# assign them with `manage.py assign_salon` when switching to several salons.
+TENANT_ALLOW_UNRESOLVED = os.getenv('TENANT_ALLOW_UNRESOLVED', 'False') == 'True'
+TENANT_EXEMPT_PATHS = ['/admin/']
+
+# Read replicas of the default database. Each alias must also be defined in DATABASES.
+# After a write, the client's reads stay on the primary for REPLICA_PIN_SECONDS.
+DATABASE_REPLICAS = [alias for alias in os.getenv('DATABASE_REPLICAS', '').split(',') if alias]
+REPLICA_PIN_SECONDS = float(os.getenv('REPLICA_PIN_SECONDS', 5))
+REPLICA_PIN_COOKIE = 'db_primary_pin'
+
+
+# Rate limits of the login and booking endpoints, per client IP and per user, keyed by URL name.
+# THROTTLE_STORE is 'memory' (per process) or 'cache' (THROTTLE_CACHE_ALIAS, shared by processes).
+THROTTLE_ENABLED = os.getenv('THROTTLE_ENABLED', 'True') == 'True'
+THROTTLE_RATES = {
+    'login': '10/m',
+    'appointment_create': '20/m',
+    'appointment_series_create': '10/m',
+    'payment_create': '20/m',
+}
+THROTTLE_STORE = os.getenv('THROTTLE_STORE', 'memory')
+THROTTLE_CACHE_ALIAS = 'default'
+
+# Number of reverse proxies (load balancers) in front of the workers. When set, client IPs
+# are read from the X-Forwarded-For header those proxies append to, instead of REMOTE_ADDR.
+TRUSTED_PROXIES = int(os.getenv('TRUSTED_PROXIES', 0))
+
+
+# Responses of the booking and payment forms are stored per idempotency key so retries and
+# double submits replay them. Use a cache shared by all processes (e.g. Redis) in production.
+IDEMPOTENCY_CACHE_ALIAS = 'default'
+IDEMPOTENCY_TTL = 60 * 60 * 24
+IDEMPOTENCY_LOCK_TIMEOUT = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Holds the service catalog, salon lookups, throttling buckets and idempotent responses
+# (one entry per submission, hence the raised MAX_ENTRIES). Use a shared backend such as
+# Redis when running several processes. The demand forecasts live in database tables.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
     }
 }
 
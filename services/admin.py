@@ -1,9 +1,83 @@
-from django.contrib import admin
-from .models import Service, Appointment, Payment, ClientProfile, Notification
+from django.contrib import admin, messages
+from .models import (
+    Salon, Service, Appointment, AppointmentStatusHistory, InvalidStatusTransition, Payment,
+    ClientProfile, Notification,
+)
 
 # Register your models here.
+admin.site.register(Salon)
 admin.site.register(Service)
-admin.site.register(Appointment)
 admin.site.register(Payment)
 admin.site.register(ClientProfile)
-admin.site.register(Notification)
\ No newline at end of file
+admin.site.register(Notification)
+
+
+@admin.register(AppointmentStatusHistory)
+class AppointmentStatusHistoryAdmin(admin.ModelAdmin):
+    """Read-only admin for the append-only status history."""
+    list_display = ['appointment', 'from_status', 'to_status', 'changed_at', 'changed_by']
+    list_filter = ['to_status']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class AppointmentStatusHistoryInline(admin.TabularInline):
+    """Read-only list of the status changes of an appointment."""
+    model = AppointmentStatusHistory
+    fields = ['from_status', 'to_status', 'changed_at', 'changed_by', 'note']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+def _transition_action(status, description):
+    """Builds an admin action moving the selected appointments to ``status`` through ``transition_to``."""
+    def action(modeladmin, request, queryset):
+        moved, refused = 0, []
+        for appointment in queryset:
+            try:
+                appointment.transition_to(status, changed_by=request.user, note="Changed in the admin.")
+            except InvalidStatusTransition:
+                refused.append(str(appointment.pk))
+            else:
+                moved += 1
+        if moved:
+            modeladmin.message_user(request, f"{moved} appointments marked as {status}.", messages.SUCCESS)
+        if refused:
+            modeladmin.message_user(
+                request, f"Appointments {', '.join(refused)} cannot move to {status}.", messages.WARNING
+            )
+
+    action.__name__ = f'mark_{status}'
+    action.short_description = description
+    return action
+
+
+@admin.register(Appointment)
+class AppointmentAdmin(admin.ModelAdmin):
+    """
+    Admin for appointments.
+
+    The status is read-only: it only changes through the actions, which go through
+    ``Appointment.transition_to`` so the allowed transitions are enforced and recorded.
+    """
+    list_display = ['id', 'client', 'service', 'appointment_date', 'status']
+    list_filter = ['status']
+    readonly_fields = ['status']
+    inlines = [AppointmentStatusHistoryInline]
+    actions = [
+        _transition_action('confirmed', "Confirm selected appointments"),
+        _transition_action('completed', "Mark selected appointments as completed"),
+        _transition_action('canceled', "Cancel selected appointments"),
+        _transition_action('no_show', "Mark selected appointments as no-shows"),
+    ]
@@ -0,0 +1,248 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import router, transaction
+from django.db.models import Case, CharField, IntegerField, Max, Min, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import Appointment, ClientReliability, Payment, ServiceDemandForecast
+from .tenancy import get_current_salon
+
+# NumPy is only needed to compute the forecasts. Web workers read them through
+# services.forecasts, which doesn't import this module.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HOURS_PER_WEEK = 7 * 24
+WEEKDAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+HISTORY_CHUNK_SIZE = 100000
+PUBLISH_BATCH_SIZE = 1000
+
+# Integer codes of the statuses the forecasts care about; every other status is 0.
+CANCELED, NO_SHOW = 1, 2
+
+
+def _require_numpy():
+    if np is None:
+        raise ImproperlyConfigured("NumPy is required to compute the demand and no-show forecasts.")
+
+
+def hour_of_week_label(hour_of_week):
+    """Returns a label such as ``'Sat 14:00'`` for an hour of the week (0 is Monday 00:00)."""
+    return f'{WEEKDAY_NAMES[hour_of_week // 24]} {hour_of_week % 24:02d}:00'
+
+
+def local_hours_of_week(dates):
+    """
+    Converts UTC datetimes to the hour of the week in the current time zone.
+
+    Only the distinct hours are converted in Python, so daylight saving time is
+    handled exactly while the cost stays independent of the number of rows.
+
+    Args:
+        dates (ndarray): ``datetime64`` values in UTC.
+
+    Returns:
+        ndarray: The hour of the week of every date, 0 being Monday 00:00.
+    """
+    hours, inverse = np.unique(dates.astype('datetime64[h]'), return_inverse=True)
+    local = [
+        timezone.localtime(datetime.fromtimestamp(int(hour) * 3600, tz=dt_timezone.utc))
+        for hour in hours.astype(np.int64)
+    ]
+    return np.array([moment.weekday() * 24 + moment.hour for moment in local], dtype=np.int64)[inverse]
+
+
+def load_appointment_history(queryset=None, chunk_size=HISTORY_CHUNK_SIZE):
+    """
+    Loads the appointment history into NumPy arrays, one chunk of rows at a time.
+
+    Dates are fetched as UTC text and parsed by NumPy, which is much faster than building
+    a ``datetime`` per row, and the status is reduced to an integer code by the database.
+    Chunks are read with keyset pagination on the primary key.
+
+    Args:
+        queryset (QuerySet): The appointments to load, by default every past appointment.
+        chunk_size (int): The number of rows fetched per query.
+
+    Returns:
+        dict: ``id``, ``service``, ``client``, ``hour`` (of the week) and ``status`` arrays.
+    """
+    _require_numpy()
+    if queryset is None:
+        queryset = Appointment.objects.filter(appointment_date__lt=timezone.now(), is_deleted=False)
+    rows = queryset.annotate(
+        date_text=Cast('appointment_date', output_field=CharField()),
+        status_code=Case(
+            When(status='canceled', then=Value(CANCELED)),
+            When(status='no_show', then=Value(NO_SHOW)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+    ).order_by('pk').values_list('pk', 'service_id', 'client_id', 'status_code', 'date_text')
+
+    integers, dates, last_pk = [], [], 0
+    while True:
+        chunk = list(rows.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            break
+        columns = list(zip(*chunk))
+        integers.append(np.array(columns[:4], dtype=np.int64))
+        dates.append(np.array([text[:19] for text in columns[4]], dtype='datetime64[s]'))
+        last_pk = chunk[-1][0]
+    history = np.concatenate(integers, axis=1) if integers else np.empty((4, 0), dtype=np.int64)
+    dates = np.concatenate(dates) if dates else np.empty(0, dtype='datetime64[s]')
+    return {
+        'id': history[0],
+        'service': history[1],
+        'client': history[2],
+        'status': history[3],
+        'hour': local_hours_of_week(dates),
+    }
+
+
+def load_deposit_ids(queryset=None, chunk_size=HISTORY_CHUNK_SIZE):
+    """
+    Loads the sorted ids of the appointments with a reservation payment, one chunk at a time.
+
+    Args:
+        queryset (QuerySet): The payments to load, by default every payment of the active salon.
+        chunk_size (int): The number of ids fetched per query.
+
+    Returns:
+        ndarray: The distinct appointment ids, in ascending order.
+    """
+    _require_numpy()
+    if queryset is None:
+        queryset = Payment.objects.all()
+    payments = queryset.filter(payment_type='reservation').order_by('appointment_id')
+    ids = payments.values_list('appointment_id', flat=True).distinct()
+    chunks, last_id = [], 0
+    while True:
+        chunk = list(ids.filter(appointment_id__gt=last_id)[:chunk_size])
+        if not chunk:
+            break
+        chunks.append(np.array(chunk, dtype=np.int64))
+        last_id = chunk[-1]
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+
+def demand_curves(service, hour, status, weeks):
+    """
+    Computes the average number of appointments per hour of the week for each service.
+
+    Canceled appointments don't count towards the demand.
+
+    Args:
+        service (ndarray): The service id of every appointment.
+        hour (ndarray): The hour of the week of every appointment.
+        status (ndarray): The status code of every appointment.
+        weeks (float): The number of weeks the history covers.
+
+    Returns:
+        tuple: The service ids and a ``(services, 168)`` array of appointments per week.
+    """
+    _require_numpy()
+    booked = status != CANCELED
+    service_ids, service_index = np.unique(service[booked], return_inverse=True)
+    counts = np.bincount(
+        service_index * HOURS_PER_WEEK + hour[booked],
+        minlength=len(service_ids) * HOURS_PER_WEEK,
+    ).reshape(len(service_ids), HOURS_PER_WEEK)
+    return service_ids, counts / max(weeks, 1)
+
+
+def client_rates(appointment_id, client, status, deposit_ids):
+    """
+    Computes the cancel, no-show and deposit rates of every client.
+
+    Args:
+        appointment_id (ndarray): The id of every appointment.
+        client (ndarray): The client id of every appointment.
+        status (ndarray): The status code of every appointment.
+        deposit_ids (ndarray): The sorted ids of the appointments with a reservation payment.
+
+    Returns:
+        dict: ``client`` ids and, aligned with them, ``appointments`` counts and
+        ``cancel_rate``, ``no_show_rate`` and ``deposit_rate`` arrays.
+    """
+    _require_numpy()
+    client_ids, client_index = np.unique(client, return_inverse=True)
+    totals = np.bincount(client_index, minlength=len(client_ids))
+    with_deposit = np.isin(appointment_id, deposit_ids, assume_unique=True)
+    return {
+        'client': client_ids,
+        'appointments': totals,
+        'cancel_rate': np.bincount(client_index, weights=status == CANCELED, minlength=len(client_ids)) / totals,
+        'no_show_rate': np.bincount(client_index, weights=status == NO_SHOW, minlength=len(client_ids)) / totals,
+        'deposit_rate': np.bincount(client_index, weights=with_deposit, minlength=len(client_ids)) / totals,
+    }
+
+
+def compute_forecasts(queryset=None):
+    """
+    Computes the demand curves and client rates of the appointment history.
+
+    Args:
+        queryset (QuerySet): The appointments to learn from, by default every past appointment.
+
+    Returns:
+        tuple: The results of ``demand_curves`` and ``client_rates``.
+    """
+    if queryset is None:
+        queryset = Appointment.objects.filter(appointment_date__lt=timezone.now(), is_deleted=False)
+    history = load_appointment_history(queryset)
+    span = queryset.aggregate(first=Min('appointment_date'), last=Max('appointment_date'))
+    weeks = (span['last'] - span['first']).days / 7 if span['first'] else 1
+    demand = demand_curves(history['service'], history['hour'], history['status'], weeks)
+    rates = client_rates(history['id'], history['client'], history['status'], load_deposit_ids())
+    return demand, rates
+
+
+def publish_forecasts(demand, rates):
+    """
+    Replaces the forecasts of the active salon with new ones, in one transaction.
+
+    The forecasts are stored in the ``ServiceDemandForecast`` and ``ClientReliability``
+    tables so every web worker reads the same tables, with one indexed query per lookup.
+
+    Returns:
+        int: The number of rows written.
+    """
+    salon = get_current_salon()
+    salon_id = salon and salon.pk
+    now = timezone.now()
+    forecasts = []
+    for service_id, curve in zip(demand[0].tolist(), demand[1]):
+        busiest = np.argsort(curve)[::-1][:3]
+        forecasts.append(ServiceDemandForecast(
+            salon_id=salon_id,
+            service_id=service_id,
+            curve=curve.round(2).tolist(),
+            busiest=[hour_of_week_label(int(hour)) for hour in busiest if curve[hour] > 0],
+            computed_at=now,
+        ))
+    reliabilities = [
+        ClientReliability(
+            salon_id=salon_id,
+            client_id=client_id,
+            appointments=appointments,
+            cancel_rate=cancel_rate,
+            no_show_rate=no_show_rate,
+            deposit_rate=deposit_rate,
+            computed_at=now,
+        )
+        for client_id, appointments, cancel_rate, no_show_rate, deposit_rate in zip(
+            rates['client'].tolist(), rates['appointments'].tolist(), rates['cancel_rate'].tolist(),
+            rates['no_show_rate'].tolist(), rates['deposit_rate'].tolist(),
+        )
+    ]
+    using = router.db_for_write(ClientReliability)
+    with transaction.atomic(using=using):
+        for model, rows in ((ServiceDemandForecast, forecasts), (ClientReliability, reliabilities)):
+            model.all_objects.using(using).filter(salon_id=salon_id).delete()
+            model.all_objects.using(using).bulk_create(rows, batch_size=PUBLISH_BATCH_SIZE)
+    return len(forecasts) + len(reliabilities)
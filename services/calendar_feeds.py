@@ -0,0 +1,164 @@
+import hashlib
+from datetime import timedelta, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.core import signing
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from .models import APPOINTMENT_DURATION, Appointment, CalendarFeedKey
+
+FEED_SIGNING_SALT = 'services.calendar_feeds'
+# Appointments older than this are left out of the feeds.
+FEED_HISTORY = timedelta(days=30)
+FEED_CHUNK_SIZE = 500
+
+ICAL_STATUSES = {
+    'reserved': 'TENTATIVE',
+    'confirmed': 'CONFIRMED',
+    'completed': 'CONFIRMED',
+    'canceled': 'CANCELLED',
+    'no_show': 'CANCELLED',
+}
+
+
+def feed_generation(user):
+    """Returns the generation of the feed URLs currently valid for a user, without writing anything."""
+    return CalendarFeedKey.objects.filter(user=user).values_list('generation', flat=True).first() or 1
+
+
+def revoke_feed_tokens(user):
+    """Invalidates every feed URL issued to a user so far."""
+    key, created = CalendarFeedKey.objects.get_or_create(user=user, defaults={'generation': 2})
+    if not created:
+        CalendarFeedKey.objects.filter(pk=key.pk).update(generation=F('generation') + 1)
+
+
+def make_feed_token(user, kind, salon=None):
+    """
+    Signs the reference to a calendar feed, to be used in its URL.
+
+    The token is bound to the user it is issued to and to their current feed generation,
+    so it can be revoked with ``revoke_feed_tokens``.
+
+    Args:
+        user (User): The user the feed URL is issued to.
+        kind (str): ``'user'`` for the appointments of the user, ``'salon'`` for every appointment of a salon.
+        salon (Salon): The salon the feed belongs to, if any.
+
+    Returns:
+        str: A URL-safe token.
+    """
+    return signing.dumps({
+        'kind': kind,
+        'user': user.pk,
+        'salon': salon and salon.pk,
+        'generation': feed_generation(user),
+    }, salt=FEED_SIGNING_SALT)
+
+
+def read_feed_token(token):
+    """
+    Returns the feed reference signed in a token, with the ``owner`` it was issued to.
+
+    Raises:
+        BadSignature: If the token was not issued by ``make_feed_token``, was revoked,
+            or its owner is no longer active.
+    """
+    feed = signing.loads(token, salt=FEED_SIGNING_SALT)
+    owner = User.objects.filter(pk=feed.get('user'), is_active=True).first()
+    if owner is None or feed.get('generation') != feed_generation(owner):
+        raise signing.BadSignature("The calendar feed was revoked.")
+    feed['owner'] = owner
+    return feed
+
+
+def feed_queryset(feed):
+    """Returns the appointments of a feed reference, without the ones older than ``FEED_HISTORY``."""
+    start = timezone.now() - FEED_HISTORY
+    queryset = Appointment.objects.filter(appointment_date__gte=start.replace(hour=0, minute=0, second=0, microsecond=0))
+    if feed['kind'] == 'user':
+        queryset = queryset.filter(client_id=feed['user'])
+    return queryset
+
+
+def feed_version(queryset):
+    """
+    Returns the ETag and last modification date of a feed with a single aggregate query.
+
+    Soft deleted appointments are included so that deleting one changes the version.
+
+    Returns:
+        tuple: The ETag (str) and the last modification date (datetime or None).
+    """
+    state = queryset.aggregate(
+        count=Count('pk'), appointments=Max('updated_at'), services=Max('service__updated_at'),
+    )
+    last_modified = max(filter(None, [state['appointments'], state['services']]), default=None)
+    fingerprint = f"{state['count']}:{state['appointments']}:{state['services']}:{timezone.now().date()}"
+    return f'"{hashlib.md5(fingerprint.encode()).hexdigest()}"', last_modified
+
+
+def _escape(text):
+    return (
+        text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Folds a content line into chunks of at most 75 octets, as RFC 5545 requires."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    chunks, current, size = [], [], 0
+    for char in line:
+        char_size = len(char.encode())
+        if size + char_size > (75 if not chunks else 74):
+            chunks.append(''.join(current))
+            current, size = [], 0
+        current.append(char)
+        size += char_size
+    chunks.append(''.join(current))
+    return '\r\n '.join(chunks) + '\r\n'
+
+
+def _format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def render_feed(queryset, name, host, with_client=False):
+    """
+    Renders a feed as iCalendar text, one event at a time.
+
+    Rows are read with ``iterator()`` as plain values, so memory use does not grow with the feed.
+
+    Args:
+        queryset (QuerySet): The appointments of the feed, including soft deleted ones.
+        name (str): The calendar name shown by calendar apps.
+        host (str): The host name used to build globally unique event ids.
+        with_client (bool): Add the client name to the event summaries, for salon feeds.
+
+    Yields:
+        str: Chunks of the iCalendar document.
+    """
+    yield (
+        'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Nail Salon//Appointments//EN\r\n'
+        'CALSCALE:GREGORIAN\r\nMETHOD:PUBLISH\r\n'
+    ) + _fold(f'X-WR-CALNAME:{_escape(name)}')
+    rows = queryset.filter(is_deleted=False).order_by('appointment_date').values_list(
+        'pk', 'appointment_date', 'status', 'updated_at', 'service__title', 'client__username',
+    )
+    for pk, start, status, updated_at, title, username in rows.iterator(chunk_size=FEED_CHUNK_SIZE):
+        summary = f'{title} - {username}' if with_client else title
+        yield ''.join([
+            'BEGIN:VEVENT\r\n',
+            _fold(f'UID:appointment-{pk}@{host}'),
+            f'DTSTAMP:{_format_datetime(updated_at)}\r\n',
+            f'DTSTART:{_format_datetime(start)}\r\n',
+            f'DTEND:{_format_datetime(start + APPOINTMENT_DURATION)}\r\n',
+            f'SEQUENCE:{int(updated_at.timestamp())}\r\n',
+            f'STATUS:{ICAL_STATUSES.get(status, "CONFIRMED")}\r\n',
+            _fold(f'SUMMARY:{_escape(summary)}'),
+            'END:VEVENT\r\n',
+        ])
+    yield 'END:VCALENDAR\r\n'
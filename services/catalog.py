@@ -0,0 +1,89 @@
+import time
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Service
+from .tenancy import get_current_salon
+
+CATALOG_CACHE_TIMEOUT = 60 * 15
+
+
+def _catalog_version_key(salon_id):
+    return f'services:catalog-version:{salon_id or "all"}'
+
+
+def _catalog_cache_key(salon_id, version):
+    return f'services:catalog:{salon_id or "all"}:{version}'
+
+
+def catalog_version(salon_id):
+    """
+    Returns the version of a salon's catalog, kept in the cache next to the catalog.
+
+    The version is replaced by ``bump_catalog_version`` whenever a service is saved or
+    deleted, which retires the cached catalog on every worker sharing the cache. A missing
+    version (first use, eviction) is replaced by a new one, never by an older one.
+
+    Returns:
+        int: The current version.
+    """
+    key = _catalog_version_key(salon_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_catalog_version(salon_id):
+    """Retires the cached catalog of a salon, and the cross-salon catalog."""
+    version = time.time_ns()
+    cache.set_many({_catalog_version_key(salon_id): version, _catalog_version_key(None): version}, None)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def invalidate_catalog(sender, instance, **kwargs):
+    """Retire the cached catalog of the salon a service belongs to when it changes."""
+    bump_catalog_version(instance.salon_id)
+
+
+def get_catalog():
+    """
+    Returns the list of services shown on the home page.
+
+    The list is read from the cache when available and loaded from the
+    database otherwise, so a cache hit runs no query. Each salon has its own
+    cached catalog, keyed by a version that saving or deleting a service
+    replaces; the cache must be shared by the workers (see ``CACHES``) for an
+    edit made on one worker to be seen by the others.
+
+    Returns:
+        list[Service]: All services offered by the salon.
+    """
+    salon = get_current_salon()
+    version = catalog_version(salon and salon.pk)
+    services = cache.get(_catalog_cache_key(salon and salon.pk, version))
+    if services is None:
+        services = prime_catalog(version)
+    return services
+
+
+def prime_catalog(version=None):
+    """
+    Loads the service catalog of the active salon from the database and stores it in the cache.
+
+    Args:
+        version (int): The catalog version returned by ``catalog_version``, read if not given.
+
+    Returns:
+        list[Service]: All services offered by the salon.
+    """
+    salon = get_current_salon()
+    if version is None:
+        version = catalog_version(salon and salon.pk)
+    services = list(Service.objects.all())
+    cache.set(_catalog_cache_key(salon and salon.pk, version), services, CATALOG_CACHE_TIMEOUT)
+    return services
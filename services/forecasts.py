@@ -0,0 +1,23 @@
+from .models import ClientReliability, ServiceDemandForecast
+
+
+def get_service_demand(service_id):
+    """
+    Returns the precomputed demand of a service, or None if it hasn't been computed.
+
+    Returns:
+        dict | None: ``curve`` (appointments per week for each hour of the week) and ``busiest`` hour labels.
+    """
+    return ServiceDemandForecast.objects.filter(service_id=service_id).values('curve', 'busiest').first()
+
+
+def get_client_reliability(client_id):
+    """
+    Returns the precomputed rates of a client at the active salon, or None if they haven't been computed.
+
+    Returns:
+        dict | None: ``appointments``, ``cancel_rate``, ``no_show_rate`` and ``deposit_rate``.
+    """
+    return ClientReliability.objects.filter(client_id=client_id).values(
+        'appointments', 'cancel_rate', 'no_show_rate', 'deposit_rate',
+    ).first()
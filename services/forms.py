@@ -1,7 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
-from .models import ClientProfile, Service, Appointment, Payment
+from .models import ClientProfile, Service, Appointment, AppointmentSeries, Payment
 
 class UserRegistrationForm(UserCreationForm):
     """
@@ -64,11 +64,33 @@ class AppointmentForm(forms.ModelForm):
             'reservation_fee': forms.NumberInput(attrs={'placeholder': 'Reservation Fee'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Built per form so the choices are limited to the salon active for this request.
+        self.fields['service'].queryset = Service.objects.all()
+
     def clean_appointment_date(self):
         # Additional validation can be added here if needed.
         appointment_date = self.cleaned_data.get('appointment_date')
         return appointment_date
 
+class RecurringAppointmentForm(forms.Form):
+    """
+    Form for booking a recurring series of appointments.
+    """
+    start_date = forms.DateTimeField(
+        widget=forms.DateTimeInput(attrs={'type': 'datetime-local'}),
+        label="First appointment",
+        help_text="Select the date and time of the first appointment."
+    )
+    frequency = forms.ChoiceField(choices=AppointmentSeries.FREQUENCY_CHOICES)
+    occurrences = forms.IntegerField(min_value=2, max_value=52, initial=6, help_text="Number of appointments to book.")
+    reservation_fee = forms.DecimalField(
+        max_digits=10, decimal_places=2,
+        widget=forms.NumberInput(attrs={'placeholder': 'Reservation Fee'}),
+        help_text="Charged for every appointment of the series."
+    )
+
 class PaymentForm(forms.ModelForm):
     """
     Form for processing a payment.
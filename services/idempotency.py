@@ -0,0 +1,118 @@
+import hashlib
+import json
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_FIELD = 'idempotency_key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+FINGERPRINT_EXCLUDED_FIELDS = {IDEMPOTENCY_FIELD, 'csrfmiddlewaretoken'}
+
+
+def new_idempotency_key():
+    """Returns a fresh key to embed in a form."""
+    return uuid.uuid4().hex
+
+
+def _cache_key(request, key):
+    owner = request.user.pk if request.user.is_authenticated else request.META.get('REMOTE_ADDR')
+    digest = hashlib.sha256(f'{owner}:{request.path}:{key}'.encode()).hexdigest()
+    return f'idempotency:{digest}'
+
+
+def _fingerprint(request):
+    """
+    Hashes the data submitted with a request.
+
+    Form submissions are hashed field by field, leaving out the CSRF token and the
+    idempotency key, which change when the same form is rendered again.
+    """
+    if request.content_type not in ('application/x-www-form-urlencoded', 'multipart/form-data'):
+        return hashlib.sha256(request.body).hexdigest()
+    fields = sorted(
+        (field, request.POST.getlist(field)) for field in request.POST if field not in FINGERPRINT_EXCLUDED_FIELDS
+    )
+    files = sorted(
+        (field, [(upload.name, upload.size) for upload in request.FILES.getlist(field)]) for field in request.FILES
+    )
+    return hashlib.sha256(json.dumps([fields, files]).encode()).hexdigest()
+
+
+def _serialize(response, fingerprint):
+    return {
+        'status': response.status_code,
+        'content': response.content,
+        'headers': list(response.items()),
+        'fingerprint': fingerprint,
+    }
+
+
+def _replay(stored, fingerprint):
+    if stored['fingerprint'] != fingerprint:
+        return HttpResponse("This idempotency key was already used with different data.", status=422)
+    response = HttpResponse(stored['content'], status=stored['status'])
+    for header, value in stored['headers']:
+        response[header] = value
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(view_func):
+    """
+    Makes a POST view safe to retry.
+
+    The idempotency key is read from the ``Idempotency-Key`` header or the
+    ``idempotency_key`` form field (see the ``idempotency_key_field`` template tag).
+    The first response for a key is stored in the ``IDEMPOTENCY_CACHE_ALIAS`` cache for
+    ``IDEMPOTENCY_TTL`` seconds and replayed for every repeat, without running the view again.
+    A repeat whose submitted data differs from the first request's gets
+    ``422 Unprocessable Entity`` instead, as the key was reused for another submission.
+    While the first request is running, concurrent duplicates wait for its result and
+    get ``409 Conflict`` if it does not arrive within ``IDEMPOTENCY_LOCK_TIMEOUT`` seconds.
+
+    Requests without a key, server errors and streaming responses are not stored.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER) or request.POST.get(IDEMPOTENCY_FIELD)
+        if request.method != 'POST' or not key:
+            return view_func(request, *args, **kwargs)
+
+        store = caches[settings.IDEMPOTENCY_CACHE_ALIAS]
+        cache_key = _cache_key(request, key)
+        fingerprint = _fingerprint(request)
+        lock_key = f'{cache_key}:lock'
+        stored = store.get(cache_key)
+        if stored is not None:
+            return _replay(stored, fingerprint)
+
+        if not store.add(lock_key, True, settings.IDEMPOTENCY_LOCK_TIMEOUT):
+            deadline = time.monotonic() + settings.IDEMPOTENCY_LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                stored = store.get(cache_key)
+                if stored is not None:
+                    return _replay(stored, fingerprint)
+                if store.get(lock_key) is None:
+                    break  # The first request failed without storing a response.
+            return HttpResponse("This request is already being processed.", status=409)
+
+        try:
+            # The first request may have stored its response and released the lock
+            # between the lookup above and taking the lock.
+            stored = store.get(cache_key)
+            if stored is not None:
+                return _replay(stored, fingerprint)
+            response = view_func(request, *args, **kwargs)
+            if response.status_code < 500 and not response.streaming:
+                store.set(cache_key, _serialize(response, fingerprint), settings.IDEMPOTENCY_TTL)
+        finally:
+            store.delete(lock_key)
+        return response
+
+    return wrapper
@@ -0,0 +1,49 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from services.models import Appointment, bulk_transition_appointments
+
+
+class Command(BaseCommand):
+    help = (
+        'Advance the status of appointments whose date has passed. Each transition is applied '
+        'with set-based SQL and recorded in the status history. Meant to run on a schedule.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float, default=2,
+            help='Only advance appointments that started at least this many hours ago.',
+        )
+        parser.add_argument(
+            '--reserved-to', choices=['completed', 'canceled'], default='completed',
+            help='Status given to past appointments that were never confirmed.',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only count the appointments to advance.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        stale = Appointment.objects.filter(appointment_date__lt=cutoff, is_deleted=False)
+        transitions = [
+            ('confirmed', 'completed'),
+            ('reserved', options['reserved_to']),
+        ]
+
+        for from_status, to_status in transitions:
+            queryset = stale.filter(status=from_status)
+            if options['dry_run']:
+                self.stdout.write(f"{from_status} -> {to_status}: {queryset.count()} appointments")
+                continue
+
+            start = time.perf_counter()
+            moved = bulk_transition_appointments(
+                queryset, to_status, note='Advanced automatically after the appointment date.'
+            ).get(from_status, 0)
+            elapsed = time.perf_counter() - start
+            rate = moved / elapsed if elapsed else 0
+            self.stdout.write(
+                f"{from_status} -> {to_status}: {moved} appointments in {elapsed:.3f}s ({rate:,.0f} rows/sec)"
+            )
@@ -0,0 +1,46 @@
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from services.models import Salon, TenantScopedModel
+
+
+class Command(BaseCommand):
+    help = (
+        'Assign the rows that belong to no salon to a salon, creating the salon if needed. '
+        'Run it when a single-salon deployment adds its first salon: once a salon exists, '
+        'rows without one are no longer visible to any request.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('slug', help='Slug of the salon the rows are assigned to.')
+        parser.add_argument('--name', help='Create the salon with this name if it does not exist yet.')
+        parser.add_argument(
+            '--admins', action='store_true',
+            help='Add every user of the Admin group to the staff of the salon.',
+        )
+
+    def handle(self, *args, **options):
+        # The salon and its rows are committed together, so no request sees the salon without its rows.
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            salon = Salon.objects.filter(slug=options['slug']).first()
+            if salon is None:
+                if not options['name']:
+                    raise CommandError(f"No salon {options['slug']!r}; pass --name to create it.")
+                salon = Salon.objects.create(name=options['name'], slug=options['slug'])
+            if salon.db_alias != DEFAULT_DB_ALIAS:
+                raise CommandError(
+                    f"{salon} uses the {salon.db_alias!r} database, but rows without a salon "
+                    f"live in the default database."
+                )
+
+            for model in apps.get_app_config('services').get_models():
+                if not issubclass(model, TenantScopedModel):
+                    continue
+                assigned = model.all_objects.filter(salon__isnull=True).update(salon=salon)
+                self.stdout.write(f"  {model._meta.verbose_name_plural}: {assigned}")
+            if options['admins']:
+                salon.staff.add(*User.objects.filter(groups__name='Admin'))
+
+        self.stdout.write(self.style.SUCCESS(f"Assigned the rows without a salon to {salon}."))
@@ -0,0 +1,141 @@
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from services.analytics import (
+    CANCELED, NO_SHOW, client_rates, demand_curves, load_appointment_history, load_deposit_ids,
+    local_hours_of_week,
+)
+from services.models import Appointment, Payment
+from services.tenancy import register_sqlite_database
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BENCH_ALIAS = 'bench_analytics'
+SEED_BATCH_SIZE = 100000
+STATUS_NAMES = {0: 'completed', CANCELED: 'canceled', NO_SHOW: 'no_show'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the vectorized demand and no-show computations on a synthetic history '
+        'of millions of appointments. With --database, the history is first written to a '
+        'temporary SQLite database and the chunked loaders that read it are timed too.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000000, help='Number of synthetic appointments.')
+        parser.add_argument('--services', type=int, default=50, help='Number of distinct services.')
+        parser.add_argument('--clients', type=int, default=200000, help='Number of distinct clients.')
+        parser.add_argument(
+            '--database', action='store_true',
+            help='Seed a temporary SQLite database and time loading the history from it.',
+        )
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError("NumPy is required to run the analytics benchmark.")
+        rows = options['rows']
+        rng = np.random.default_rng(0)
+        history = {
+            'id': np.arange(1, rows + 1, dtype=np.int64),
+            'service': rng.integers(1, options['services'] + 1, rows),
+            'client': rng.integers(1, options['clients'] + 1, rows),
+            'status': rng.choice([0, CANCELED, NO_SHOW], rows, p=[0.85, 0.1, 0.05]),
+        }
+        # Sorted like a real history, where ids grow with the booking dates; it also keeps seeding fast.
+        seconds = np.sort(rng.integers(0, 104 * 7 * 24 * 3600, rows))
+        dates = np.datetime64('2023-01-02T00:00:00') + seconds.astype('timedelta64[s]')
+        deposit_ids = np.sort(rng.choice(history['id'], rows * 3 // 4, replace=False))
+
+        if options['database']:
+            history, deposit_ids = self.load_from_database(history, dates, deposit_ids)
+        else:
+            history['hour'] = local_hours_of_week(dates)
+
+        start = time.perf_counter()
+        service_ids, curves = demand_curves(history['service'], history['hour'], history['status'], weeks=104)
+        demand_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rates = client_rates(history['id'], history['client'], history['status'], deposit_ids)
+        rates_seconds = time.perf_counter() - start
+
+        self.stdout.write(f"Rows: {rows:,}  services: {len(service_ids)}  clients: {len(rates['client']):,}")
+        self.stdout.write(f"Demand curves: {demand_seconds:.3f}s ({rows / demand_seconds:,.0f} rows/sec)")
+        self.stdout.write(f"Client rates:  {rates_seconds:.3f}s ({rows / rates_seconds:,.0f} rows/sec)")
+        self.stdout.write(f"Mean no-show rate: {rates['no_show_rate'].mean():.3f}  (expected ~0.05)")
+
+    def load_from_database(self, history, dates, deposit_ids):
+        """
+        Writes the synthetic history to a temporary SQLite database and loads it back
+        with ``load_appointment_history`` and ``load_deposit_ids``, timing both.
+
+        Returns:
+            tuple: The loaded history and deposit ids.
+        """
+        rows = len(history['id'])
+        with tempfile.TemporaryDirectory() as tmp:
+            register_sqlite_database(BENCH_ALIAS, Path(tmp) / f'{BENCH_ALIAS}.sqlite3')
+            try:
+                call_command('migrate', database=BENCH_ALIAS, verbosity=0, interactive=False)
+                start = time.perf_counter()
+                self.seed(history, dates, deposit_ids)
+                self.stdout.write(f"Seeded {rows:,} appointments in {time.perf_counter() - start:.1f}s")
+
+                start = time.perf_counter()
+                loaded = load_appointment_history(Appointment.all_objects.using(BENCH_ALIAS).filter(is_deleted=False))
+                history_seconds = time.perf_counter() - start
+                start = time.perf_counter()
+                loaded_deposit_ids = load_deposit_ids(Payment.all_objects.using(BENCH_ALIAS))
+                deposits_seconds = time.perf_counter() - start
+            finally:
+                connections[BENCH_ALIAS].close()
+                del connections[BENCH_ALIAS]
+                del connections.settings[BENCH_ALIAS]
+
+        if len(loaded['id']) != rows or len(loaded_deposit_ids) != len(deposit_ids):
+            raise CommandError("The history loaded from the database doesn't match the seeded rows.")
+        self.stdout.write(f"Load history:  {history_seconds:.3f}s ({rows / history_seconds:,.0f} rows/sec)")
+        self.stdout.write(
+            f"Load deposits: {deposits_seconds:.3f}s ({len(deposit_ids) / deposits_seconds:,.0f} rows/sec)"
+        )
+        return loaded, loaded_deposit_ids
+
+    def seed(self, history, dates, deposit_ids):
+        """Inserts the appointments and their reservation payments with batched ``executemany``."""
+        connection = connections[BENCH_ALIAS]
+        quote = connection.ops.quote_name
+        # The benchmark doesn't create the users and services the rows point to.
+        with connection.constraint_checks_disabled(), transaction.atomic(using=BENCH_ALIAS):
+            with connection.cursor() as cursor:
+                for start in range(0, len(history['id']), SEED_BATCH_SIZE):
+                    batch = slice(start, start + SEED_BATCH_SIZE)
+                    # Django stores SQLite datetimes as 'YYYY-MM-DD HH:MM:SS' in UTC.
+                    date_text = np.char.replace(np.datetime_as_string(dates[batch], unit='s'), 'T', ' ')
+                    cursor.executemany(
+                        f"INSERT INTO {quote(Appointment._meta.db_table)} "
+                        "(id, client_id, service_id, appointment_date, status, reservation_fee, "
+                        "created_at, updated_at, is_deleted) VALUES (%s, %s, %s, %s, %s, 10, %s, %s, 0)",
+                        [
+                            (pk, client, service, date, STATUS_NAMES[status], date, date)
+                            for pk, client, service, status, date in zip(
+                                history['id'][batch].tolist(), history['client'][batch].tolist(),
+                                history['service'][batch].tolist(), history['status'][batch].tolist(),
+                                date_text.tolist(),
+                            )
+                        ],
+                    )
+                for start in range(0, len(deposit_ids), SEED_BATCH_SIZE):
+                    cursor.executemany(
+                        f"INSERT INTO {quote(Payment._meta.db_table)} "
+                        "(appointment_id, amount, timestamp, payment_type) VALUES (%s, 10, '2023-01-02 00:00:00', 'reservation')",
+                        [(pk,) for pk in deposit_ids[start:start + SEED_BATCH_SIZE].tolist()],
+                    )
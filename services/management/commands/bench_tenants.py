@@ -0,0 +1,104 @@
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from services.models import Appointment, Salon, Service
+from services.tenancy import migrate_tenant_database, tenant_context
+
+TEMPLATE_ALIAS = 'bench_template'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark per-salon dashboard query latency as the number of salons grows. '
+        'Salon databases are SQLite files in a temporary directory; the benchmark salons '
+        'are removed from the salon registry afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salons', default='1,2,4,8,16', help='Comma separated salon counts to measure.')
+        parser.add_argument('--shard-size', type=int, default=1, help='Number of salons sharing one database.')
+        parser.add_argument('--appointments', type=int, default=1000, help='Appointments seeded per salon.')
+        parser.add_argument('--requests', type=int, default=500, help='Dashboard queries per measurement.')
+
+    def handle(self, *args, **options):
+        counts = sorted(int(count) for count in options['salons'].split(','))
+        salons, aliases = [], set()
+        with tempfile.TemporaryDirectory() as tmp, override_settings(TENANT_DATABASE_DIR=tmp):
+            try:
+                # Migrate one pristine database and copy it for every shard.
+                migrate_tenant_database(TEMPLATE_ALIAS)
+                connections[TEMPLATE_ALIAS].close()
+                aliases.add(TEMPLATE_ALIAS)
+
+                self.stdout.write(f"{'salons':>7} {'databases':>10} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8}")
+                for count in counts:
+                    while len(salons) < count:
+                        alias = f'bench_tenant_{len(salons) // options["shard_size"]}'
+                        if alias not in aliases:
+                            shutil.copy(Path(tmp) / f'{TEMPLATE_ALIAS}.sqlite3', Path(tmp) / f'{alias}.sqlite3')
+                            aliases.add(alias)
+                        salon = Salon.objects.create(
+                            name=f'Benchmark salon {len(salons)}',
+                            slug=f'bench-{timezone.now():%Y%m%d%H%M%S%f}-{len(salons)}',
+                            db_alias=alias,
+                        )
+                        self.seed(salon, options['appointments'])
+                        salons.append(salon)
+                    latencies = self.measure(salons, options['requests'])
+                    self.stdout.write(
+                        f"{count:>7} {len(aliases) - 1:>10} {statistics.mean(latencies):>9.3f} "
+                        f"{statistics.median(latencies):>8.3f} "
+                        f"{statistics.quantiles(latencies, n=20)[-1]:>8.3f}"
+                    )
+            finally:
+                Salon.objects.filter(pk__in=[salon.pk for salon in salons]).delete()
+                for alias in aliases:
+                    connections[alias].close()
+                    del connections[alias]
+                    del connections.settings[alias]
+
+    def seed(self, salon, appointments):
+        """Creates a client, a few services and ``appointments`` appointments for a salon."""
+        now = timezone.now()
+        with tenant_context(salon):
+            client = User.objects.create(username=f'client-{salon.slug}')
+            services = [
+                Service.objects.create(title=f'Service {index}', description='Benchmark service', price=20 + index)
+                for index in range(5)
+            ]
+            Appointment.objects.bulk_create([
+                Appointment(
+                    salon_id=salon.pk,
+                    client=client,
+                    service=services[index % len(services)],
+                    appointment_date=now + timedelta(hours=index),
+                    reservation_fee=10,
+                )
+                for index in range(appointments)
+            ])
+
+    def measure(self, salons, requests):
+        """Runs the client dashboard query for random salons and returns the latencies in ms."""
+        latencies = []
+        for _ in range(requests):
+            salon = random.choice(salons)
+            with tenant_context(salon):
+                start = time.perf_counter()
+                client = User.objects.get(username=f'client-{salon.slug}')
+                list(
+                    Appointment.objects.filter(client=client, is_deleted=False)
+                    .select_related('service').order_by('-appointment_date')[:50]
+                )
+                latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from services.analytics import compute_forecasts, publish_forecasts
+from services.models import Salon
+from services.tenancy import tenant_context
+
+
+class Command(BaseCommand):
+    help = (
+        'Compute hour-of-week demand curves per service and cancel/no-show rates per client '
+        'from the appointment history of every salon and store them in the forecast tables. '
+        'Meant to run on a schedule.'
+    )
+
+    def handle(self, *args, **options):
+        # Without salons, the whole history belongs to a single-salon deployment.
+        for salon in list(Salon.objects.all()) or [None]:
+            with tenant_context(salon):
+                start = time.perf_counter()
+                demand, rates = compute_forecasts()
+                computed = time.perf_counter()
+                rows = publish_forecasts(demand, rates)
+                published = time.perf_counter()
+
+            self.stdout.write(f"{salon or 'All appointments'}:")
+            self.stdout.write(f"  Appointments: {int(rates['appointments'].sum())}")
+            self.stdout.write(f"  Services: {len(demand[0])}  clients: {len(rates['client'])}")
+            self.stdout.write(f"  Loaded and computed in {computed - start:.2f}s")
+            self.stdout.write(self.style.SUCCESS(f"  Stored {rows} forecast rows in {published - computed:.2f}s"))
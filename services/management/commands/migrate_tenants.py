@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from services.models import Salon
+from services.tenancy import migrate_tenant_database
+
+
+class Command(BaseCommand):
+    help = 'Apply migrations to the database of every salon that does not use the default database.'
+
+    def handle(self, *args, **options):
+        aliases = (
+            Salon.objects.exclude(db_alias=DEFAULT_DB_ALIAS)
+            .order_by('db_alias').values_list('db_alias', flat=True).distinct()
+        )
+        for alias in aliases:
+            migrate_tenant_database(alias, verbosity=options['verbosity'] - 1)
+            self.stdout.write(f"Migrated tenant database: {alias}")
@@ -0,0 +1,117 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs inside a fresh interpreter so that the imports and the first request are really cold.
+PROBE = """
+import json, os, sys, time
+from wsgiref.util import setup_testing_defaults
+
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+from config.wsgi import application
+loaded = time.perf_counter()
+from services import warmup
+
+
+def request(path, host):
+    environ = {'PATH_INFO': path, 'HTTP_HOST': host, 'SERVER_NAME': host}
+    setup_testing_defaults(environ)
+    status = []
+    began = time.perf_counter()
+    response = application(environ, lambda s, headers, exc_info=None: status.append(s))
+    b''.join(response)
+    if hasattr(response, 'close'):
+        response.close()
+    return status[0], (time.perf_counter() - began) * 1000
+
+
+first_status, first_ms = request(sys.argv[1], sys.argv[2])
+second_status, second_ms = request(sys.argv[1], sys.argv[2])
+print(json.dumps({
+    'load_ms': (loaded - start) * 1000,
+    'first_status': first_status,
+    'first_ms': first_ms,
+    'second_status': second_status,
+    'second_ms': second_ms,
+    'total_ms': (time.perf_counter() - start) * 1000 - second_ms,
+    'warmup': warmup.last_report and warmup.last_report._asdict(),
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Profile a cold worker start: per-module import time and the time to the first response. '
+        'The WSGI application is loaded in a fresh interpreter with `python -X importtime`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/', help='Path of the first request (default: /).')
+        parser.add_argument('--host', default='127.0.0.1', help='Host header of the first request.')
+        parser.add_argument('--top', type=int, default=20, help='Number of slowest modules to list.')
+        parser.add_argument(
+            '--no-warmup', action='store_true',
+            help='Start the worker with WARMUP_ON_STARTUP disabled to compare against the warm-up.',
+        )
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        env['WARMUP_ON_STARTUP'] = 'False' if options['no_warmup'] else 'True'
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE, options['path'], options['host']],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        imports, errors = self.parse_importtime(result.stderr)
+        if result.returncode != 0:
+            raise CommandError("Worker failed to start:\n" + "\n".join(errors))
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+
+        self.stdout.write(f"Slowest imports (cumulative, top {options['top']}):")
+        for name, self_us, cumulative_us in sorted(imports, key=lambda row: -row[2])[:options['top']]:
+            self.stdout.write(f"  {cumulative_us / 1000:9.1f} ms  (self {self_us / 1000:7.1f} ms)  {name}")
+
+        packages = defaultdict(int)
+        for name, self_us, _ in imports:
+            packages[name.strip().split('.')[0]] += self_us
+        self.stdout.write("\nImport time by top-level package (self):")
+        for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"  {self_us / 1000:9.1f} ms  {package}")
+
+        self.stdout.write("\nStartup:")
+        self.stdout.write(f"  warm-up on startup:     {'no' if options['no_warmup'] else 'yes'}")
+        if timings['warmup']:
+            for step, ms in timings['warmup']['timings'].items():
+                error = timings['warmup']['failures'].get(step)
+                line = f"    {step:<20}{ms:9.1f} ms  {'FAILED: ' + error if error else 'ok'}"
+                self.stdout.write(self.style.ERROR(line) if error else line)
+        self.stdout.write(f"  load application:       {timings['load_ms']:9.1f} ms")
+        self.stdout.write(f"  first response:         {timings['first_ms']:9.1f} ms  ({timings['first_status']})")
+        self.stdout.write(f"  second response:        {timings['second_ms']:9.1f} ms  ({timings['second_status']})")
+        self.stdout.write(self.style.SUCCESS(f"  time to first response: {timings['total_ms']:9.1f} ms"))
+
+    def parse_importtime(self, stderr):
+        """
+        Parses the output of ``python -X importtime``.
+
+        Args:
+            stderr (str): The standard error of the profiled interpreter.
+
+        Returns:
+            tuple: A list of ``(module, self_us, cumulative_us)`` rows and the remaining stderr lines.
+        """
+        imports, other = [], []
+        for line in stderr.splitlines():
+            if not line.startswith('import time:'):
+                other.append(line)
+                continue
+            fields = line[len('import time:'):].split('|')
+            if len(fields) != 3 or not fields[0].strip().isdigit():
+                continue  # The header line.
+            imports.append((fields[2].rstrip(), int(fields[0]), int(fields[1])))
+        return imports, other
@@ -0,0 +1,78 @@
+import threading
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from services.idempotency import REPLAYED_HEADER, new_idempotency_key
+from services.models import Appointment, Service
+
+
+class Command(BaseCommand):
+    help = (
+        'Submit the same booking from many threads at once, as double clicks and client '
+        'retries would, and report how many appointments were created.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=20, help='Number of parallel identical submissions.')
+        parser.add_argument('--rounds', type=int, default=5, help='Number of distinct bookings to submit.')
+        parser.add_argument('--no-key', action='store_true', help='Submit without an idempotency key.')
+
+    def handle(self, *args, **options):
+        service = Service.objects.create(title='Idempotency stress', description='Stress test service', price=20)
+        user = User.objects.create(username=f'idempotency-stress-{timezone.now():%Y%m%d%H%M%S%f}')
+        clients = [Client(HTTP_HOST='localhost') for _ in range(options['threads'])]
+        for client in clients:
+            client.force_login(user)
+
+        statuses = Counter()
+        try:
+            # The stress service belongs to no salon, so it is only reachable without a tenant.
+            with override_settings(THROTTLE_ENABLED=False, TENANT_ALLOW_UNRESOLVED=True):
+                for round_number in range(options['rounds']):
+                    data = {
+                        'service': service.id,
+                        'appointment_date': f'2030-01-{round_number + 1:02d}T10:00',
+                        'reservation_fee': '10',
+                    }
+                    if not options['no_key']:
+                        data['idempotency_key'] = new_idempotency_key()
+                    statuses.update(self.submit_concurrently(clients, reverse('appointment_create', args=[service.id]), data))
+            created = Appointment.all_objects.filter(client=user).count()
+        finally:
+            Appointment.all_objects.filter(client=user).delete()
+            user.delete()
+            service.delete()
+
+        self.stdout.write(f"Submissions: {options['rounds']} bookings x {options['threads']} parallel requests")
+        for status, count in sorted(statuses.items()):
+            self.stdout.write(f"  {status}: {count}")
+        style = self.style.SUCCESS if created == options['rounds'] else self.style.ERROR
+        self.stdout.write(style(f"Appointments created: {created} (expected {options['rounds']})"))
+
+    def submit_concurrently(self, clients, path, data):
+        """Posts ``data`` from every client at the same moment and returns the response kinds."""
+        barrier = threading.Barrier(len(clients))
+        results = []
+
+        def submit(client):
+            try:
+                barrier.wait()
+                response = client.post(path, data)
+                replayed = ' (replayed)' if response.get(REPLAYED_HEADER) else ''
+                results.append(f'{response.status_code}{replayed}')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
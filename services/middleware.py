@@ -0,0 +1,200 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse
+from django.urls import get_script_prefix, set_script_prefix
+
+from .models import Salon
+from .routers import primary_reads, track_writes
+from .tenancy import reset_current_salon, set_current_salon
+from .throttling import client_ip, get_bucket_store, parse_rate
+
+# Bounds how long a worker may use a salon lookup cached before a change it wasn't told about.
+SALON_CACHE_TIMEOUT = 60
+SALON_PATH_PREFIX = '/s/'
+SALON_VERSION_KEY = 'tenancy:salons-version'
+
+
+def _salons_version():
+    """
+    Returns the version of the salon registry, replaced whenever a salon is saved or deleted.
+
+    The cached lookups are keyed by this version, so a change retires them on every worker
+    sharing the cache; ``SALON_CACHE_TIMEOUT`` bounds the staleness of unshared caches.
+    """
+    version = cache.get(SALON_VERSION_KEY)
+    if version is None:
+        cache.add(SALON_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(SALON_VERSION_KEY)
+    return version
+
+
+def _salon_cache_key(field, value):
+    return f'tenancy:salon:{_salons_version()}:{field}:{value}'
+
+
+def _lookup_salon(field, value):
+    """
+    Returns the salon whose ``field`` equals ``value``, caching hits and misses.
+
+    Args:
+        field (str): Either ``'domain'`` or ``'slug'``.
+        value (str): The host name or slug to look up.
+
+    Returns:
+        Salon | None: The matching salon, if any.
+    """
+    key = _salon_cache_key(field, value)
+    salon = cache.get(key)
+    if salon is None:
+        salon = Salon.objects.filter(**{field: value}).first() or False
+        cache.set(key, salon, SALON_CACHE_TIMEOUT)
+    return salon or None
+
+
+def _salons_exist():
+    """Returns True once any salon exists, cached like the lookups."""
+    key = _salon_cache_key('exists', '')
+    exists = cache.get(key)
+    if exists is None:
+        exists = Salon.objects.exists()
+        cache.set(key, exists, SALON_CACHE_TIMEOUT)
+    return exists
+
+
+@receiver(post_save, sender=Salon)
+@receiver(post_delete, sender=Salon)
+def invalidate_salon(sender, instance, **kwargs):
+    """Retire every cached salon lookup when a salon changes."""
+    cache.set(SALON_VERSION_KEY, time.time_ns(), None)
+
+
+class TenantMiddleware:
+    """
+    Resolves the salon of each request and activates it for the duration of the request.
+
+    The salon is resolved from the request host (``Salon.domain``) first, then from
+    a ``/s/<slug>/`` path prefix. The prefix is stripped before URL resolution and
+    added to the script prefix, so ``reverse()`` and ``{% url %}`` keep it.
+
+    Without a tenant every salon's rows are visible, so requests matching no salon
+    are answered with a 404 once a salon exists, except under ``TENANT_EXEMPT_PATHS``
+    (the cross-salon admin). Single-salon deployments have no ``Salon`` row and run
+    without a tenant; ``TENANT_ALLOW_UNRESOLVED`` restores that fallback on purpose.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        script_prefix = get_script_prefix()
+        try:
+            salon = self.resolve_salon(request)
+            if salon is None and not self.allow_unresolved(request):
+                raise Http404("Unknown salon.")
+            request.salon = salon
+            token = set_current_salon(salon)
+            try:
+                return self.get_response(request)
+            finally:
+                reset_current_salon(token)
+        finally:
+            # The script prefix is thread-local: don't leak the salon prefix to the next request.
+            set_script_prefix(script_prefix)
+
+    def allow_unresolved(self, request):
+        if settings.TENANT_ALLOW_UNRESOLVED:
+            return True
+        if request.path_info.startswith(tuple(settings.TENANT_EXEMPT_PATHS)):
+            return True
+        return not _salons_exist()
+
+    def resolve_salon(self, request):
+        salon = _lookup_salon('domain', request.get_host().split(':')[0])
+        if salon is not None:
+            return salon
+
+        path = request.path_info
+        if not path.startswith(SALON_PATH_PREFIX):
+            return None
+        slug, _, rest = path[len(SALON_PATH_PREFIX):].partition('/')
+        salon = _lookup_salon('slug', slug) if slug else None
+        if salon is not None:
+            prefix = f'{SALON_PATH_PREFIX}{slug}'
+            request.path_info = '/' + rest
+            request.META['SCRIPT_NAME'] = request.META.get('SCRIPT_NAME', '') + prefix
+            set_script_prefix(request.META['SCRIPT_NAME'] + '/')
+        return salon
+
+
+class ReplicaPinningMiddleware:
+    """
+    Pins a client's reads to the primary database for a short window after it writes.
+
+    When a request writes to the primary, a cookie valid for ``REPLICA_PIN_SECONDS``
+    is set; requests carrying it read from the primary, so the client sees its own
+    writes despite replication lag. Nothing happens when no replicas are configured.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        with track_writes() as writes:
+            if settings.REPLICA_PIN_COOKIE in request.COOKIES:
+                with primary_reads():
+                    response = self.get_response(request)
+            else:
+                response = self.get_response(request)
+
+        if writes['wrote'] and settings.REPLICA_PIN_SECONDS:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class ThrottleMiddleware:
+    """
+    Rate limits writes to the routes listed in ``THROTTLE_RATES``, keyed by URL name.
+
+    Every POST (or other unsafe method) to a throttled route takes a token from the
+    bucket of the client IP (see ``client_ip``) and, for authenticated users, from the
+    bucket of the user. When either bucket is empty the request is answered with
+    ``429 Too Many Requests`` and a ``Retry-After`` header, before the view runs, and
+    no token is taken from the other bucket.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.THROTTLE_ENABLED or request.method in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            return None
+        route = request.resolver_match.url_name
+        rate = settings.THROTTLE_RATES.get(route)
+        if rate is None:
+            return None
+
+        capacity, refill_rate = parse_rate(rate)
+        store = get_bucket_store()
+        keys = [f'{route}:ip:{client_ip(request)}']
+        if request.user.is_authenticated:
+            keys.append(f'{route}:user:{request.user.pk}')
+        retry_after = store.consume_all(keys, capacity, refill_rate)
+        if retry_after:
+            response = HttpResponse("Too many requests. Please try again later.", status=429)
+            response['Retry-After'] = str(math.ceil(retry_after))
+            return response
+        return None
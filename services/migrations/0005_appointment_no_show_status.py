@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0004_appointment_series'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointment',
+            name='status',
+            field=models.CharField(choices=[('reserved', 'Reserved'), ('confirmed', 'Confirmed'), ('completed', 'Completed'), ('canceled', 'Canceled'), ('no_show', 'No-show')], default='reserved', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='appointmentstatushistory',
+            name='from_status',
+            field=models.CharField(choices=[('reserved', 'Reserved'), ('confirmed', 'Confirmed'), ('completed', 'Completed'), ('canceled', 'Canceled'), ('no_show', 'No-show')], max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='appointmentstatushistory',
+            name='to_status',
+            field=models.CharField(choices=[('reserved', 'Reserved'), ('confirmed', 'Confirmed'), ('completed', 'Completed'), ('canceled', 'Canceled'), ('no_show', 'No-show')], max_length=10),
+        ),
+    ]
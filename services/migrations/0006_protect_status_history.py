@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0005_appointment_no_show_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointmentstatushistory',
+            name='appointment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='status_history', to='services.appointment'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0006_protect_status_history'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceDemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('curve', models.JSONField()),
+                ('busiest', models.JSONField()),
+                ('computed_at', models.DateTimeField()),
+                ('salon', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='services.salon')),
+                ('service', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecast', to='services.service')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ClientReliability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('appointments', models.PositiveIntegerField()),
+                ('cancel_rate', models.FloatField()),
+                ('no_show_rate', models.FloatField()),
+                ('deposit_rate', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reliability', to=settings.AUTH_USER_MODEL)),
+                ('salon', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='services.salon')),
+            ],
+            options={
+                'verbose_name_plural': 'client reliability',
+                'constraints': [models.UniqueConstraint(fields=('salon', 'client'), name='unique_client_reliability_per_salon')],
+            },
+        ),
+    ]
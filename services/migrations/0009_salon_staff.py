@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0008_calendar_feed_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salon',
+            name='staff',
+            field=models.ManyToManyField(blank=True, help_text='Users working at the salon', related_name='salons', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0009_salon_staff'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointmentstatushistory',
+            name='appointment',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='status_history', to='services.appointment'),
+        ),
+    ]
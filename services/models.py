@@ -1,10 +1,79 @@
 from django.utils.text import slugify
-from django.db import transaction
+from django.utils import timezone
+from collections import namedtuple
+from datetime import timedelta
+import bisect
+import calendar
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
 from django.db import models
 from django.contrib.auth.models import User
 import uuid
 
-class ClientProfile(models.Model):
+from .tenancy import TenantManager, get_current_salon
+
+
+class Salon(models.Model):
+    """
+    A salon (tenant) using the application.
+
+    Attributes:
+        name (str): The display name of the salon.
+        slug (str): A unique slug used to resolve the salon from the URL path (``/s/<slug>/``).
+        domain (str): An optional host name used to resolve the salon from the request host.
+        db_alias (str): The database holding the salon's data. Several salons may share one database (shard).
+        staff (ManyToManyField): The users working at the salon. Admins may only manage the salons they work at.
+        created_at (datetime): The date and time when the salon was created.
+
+    Methods:
+        has_staff(user): Checks whether a user works at the salon.
+        __str__(): Returns the name of the salon.
+    """
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(unique=True)
+    domain = models.CharField(max_length=255, unique=True, blank=True, null=True)
+    db_alias = models.CharField(max_length=64, default='default', help_text="Database or shard holding the salon's data")
+    staff = models.ManyToManyField(User, blank=True, related_name='salons', help_text="Users working at the salon")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+    def has_staff(self, user):
+        """Return True if ``user`` works at the salon."""
+        return user.is_authenticated and self.staff.filter(pk=user.pk).exists()
+
+
+class TenantScopedModel(models.Model):
+    """
+    Abstract base for models whose rows belong to a salon.
+
+    Attributes:
+        salon (ForeignKey): The salon owning the row. The salon registry lives in the default
+            database while the row may live in a tenant database, so no database constraint is created.
+        objects (TenantManager): Only returns rows of the active salon.
+        all_objects (Manager): Returns the rows of every salon.
+
+    Methods:
+        save(*args, **kwargs): Assigns the active salon to new rows before saving.
+    """
+    salon = models.ForeignKey(Salon, on_delete=models.DO_NOTHING, db_constraint=False, blank=True, null=True)
+
+    objects = TenantManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self.salon_id is None:
+            salon = get_current_salon()
+            if salon is not None:
+                self.salon_id = salon.pk
+        super().save(*args, **kwargs)
+
+
+class ClientProfile(TenantScopedModel):
     """
     ClientProfile model represents the profile information of a client in the nail salon application.
 
@@ -25,7 +94,7 @@ class ClientProfile(models.Model):
     def __str__(self):
         return self.user.username
     
-class Service(models.Model):
+class Service(TenantScopedModel):
     """
     A Django model representing a service offered by the nail salon.
 
@@ -58,14 +127,131 @@ class Service(models.Model):
     def __str__(self):
         return self.title
     
-class Appointment(models.Model):
+class AppointmentSeries(TenantScopedModel):
+    """
+    A recurring booking of the same service by a client.
+
+    Attributes:
+        FREQUENCY_CHOICES (list of tuple): The recurrence rules available.
+        client (ForeignKey): The user who booked the series.
+        service (ForeignKey): The service booked at every occurrence.
+        frequency (CharField): How often the appointment recurs.
+        start_date (DateTimeField): The date and time of the first occurrence.
+        occurrences (PositiveSmallIntegerField): The number of occurrences requested.
+        reservation_fee (DecimalField): The reservation fee paid for every occurrence.
+        created_at (DateTimeField): The date and time when the series was created.
+
+    Methods:
+        occurrence_dates(): Expands the recurrence rule into the dates of the occurrences.
+        cancel_from(date, note=...): Cancels this and all future open occurrences.
+        reschedule_from(date, delta): Moves this and all future open occurrences by ``delta``.
+        __str__(): Returns a string representation of the series.
+    """
+    FREQUENCY_CHOICES = [
+        ('weekly', 'Weekly'),
+        ('biweekly', 'Every two weeks'),
+        ('monthly', 'Monthly'),
+    ]
+    client = models.ForeignKey(User, on_delete=models.CASCADE)
+    service = models.ForeignKey(Service, on_delete=models.CASCADE)
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    start_date = models.DateTimeField()
+    occurrences = models.PositiveSmallIntegerField()
+    reservation_fee = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'appointment series'
+
+    def __str__(self):
+        return f"{self.client.username} - {self.service.title} ({self.get_frequency_display()})"
+
+    def occurrence_dates(self):
+        """
+        Expands the recurrence rule into the dates of the occurrences.
+
+        Monthly occurrences keep the day of the month of the first occurrence,
+        falling back to the last day of shorter months.
+
+        Returns:
+            list[datetime]: The dates of the occurrences, in order.
+        """
+        if self.frequency == 'monthly':
+            dates = []
+            for index in range(self.occurrences):
+                month = self.start_date.month - 1 + index
+                year, month = self.start_date.year + month // 12, month % 12 + 1
+                day = min(self.start_date.day, calendar.monthrange(year, month)[1])
+                dates.append(self.start_date.replace(year=year, month=month, day=day))
+            return dates
+        step = timedelta(weeks=2 if self.frequency == 'biweekly' else 1)
+        return [self.start_date + step * index for index in range(self.occurrences)]
+
+    def cancel_from(self, date, note='Canceled this and future occurrences.'):
+        """
+        Cancels the occurrences on or after ``date`` that are still open.
+
+        Args:
+            date (datetime): The date of the first occurrence to cancel.
+            note (str): The note stored in the status history.
+
+        Returns:
+            int: The number of occurrences canceled.
+        """
+        moved = bulk_transition_appointments(
+            self.open_occurrences_from(date), 'canceled', note=note
+        )
+        return sum(moved.values())
+
+    def reschedule_from(self, date, delta):
+        """
+        Moves the open occurrences on or after ``date`` by ``delta`` with a single ``UPDATE``.
+
+        Args:
+            date (datetime): The date of the first occurrence to move.
+            delta (timedelta): How far to move the occurrences.
+
+        Returns:
+            int: The number of occurrences moved.
+
+        Raises:
+            ValidationError: If a moved occurrence would conflict with another appointment.
+        """
+        using = router.db_for_write(Appointment)
+        with transaction.atomic(using=using):
+            occurrences = self.open_occurrences_from(date).using(using)
+            dates = list(occurrences.values_list('appointment_date', flat=True))
+            conflicts = find_conflicts(
+                self.client, [moved + delta for moved in dates], exclude=occurrences,
+            )
+            if conflicts:
+                raise ValidationError(
+                    "The new time conflicts with other appointments on "
+                    + ", ".join(f"{conflict:%Y-%m-%d %H:%M}" for conflict in conflicts) + "."
+                )
+            return occurrences.update(
+                appointment_date=models.F('appointment_date') + delta, updated_at=timezone.now()
+            )
+
+    def open_occurrences_from(self, date):
+        """Returns the occurrences on or after ``date`` that are neither canceled nor completed."""
+        return Appointment.all_objects.filter(
+            series=self, appointment_date__gte=date, is_deleted=False,
+            status__in=Appointment.OPEN_STATUSES,
+        )
+
+
+class Appointment(TenantScopedModel):
     """
     Represents an appointment for a service at the nail salon.
 
     Attributes:
         STATUS_CHOICES (list of tuple): The status options for the appointment.
+        STATUS_TRANSITIONS (dict): The statuses each status may move to.
+        OPEN_STATUSES (tuple): The statuses of appointments that may still be moved or canceled.
         client (ForeignKey): The user who made the appointment.
         service (ForeignKey): The service that the appointment is for.
+        series (ForeignKey): The recurring series the appointment belongs to, if any.
         appointment_date (DateTimeField): The date and time of the appointment.
         status (CharField): The current status of the appointment.
         reservation_fee (DecimalField): The fee for reserving the appointment.
@@ -76,15 +262,31 @@ class Appointment(models.Model):
     Methods:
         __str__(): Returns a string representation of the appointment.
         delete(): Soft deletes the appointment by setting is_deleted to True.
+        is_open: Whether the appointment may still be moved or canceled.
+        can_transition_to(status): Checks whether the appointment may move to a status.
+        transition_to(status, changed_by=None, note=''): Moves the appointment to a status and records it.
     """
     STATUS_CHOICES = [
         ('reserved', 'Reserved'),
         ('confirmed', 'Confirmed'),
         ('completed', 'Completed'),
         ('canceled', 'Canceled'),
+        ('no_show', 'No-show'),
     ]
+    STATUS_TRANSITIONS = {
+        'reserved': {'confirmed', 'completed', 'canceled', 'no_show'},
+        'confirmed': {'completed', 'canceled', 'no_show'},
+        'completed': set(),
+        'canceled': set(),
+        'no_show': set(),
+    }
+    # Statuses of appointments that are still to come and may be moved or canceled.
+    OPEN_STATUSES = ('reserved', 'confirmed')
     client = models.ForeignKey(User, on_delete=models.CASCADE)
     service = models.ForeignKey(Service, on_delete=models.CASCADE)
+    series = models.ForeignKey(
+        AppointmentSeries, on_delete=models.SET_NULL, blank=True, null=True, related_name='appointments'
+    )
     appointment_date = models.DateTimeField(db_index=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='reserved')
     reservation_fee = models.DecimalField(max_digits=10, decimal_places=2)
@@ -93,6 +295,12 @@ class Appointment(models.Model):
 
     is_deleted = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['salon', 'appointment_date']),
+            models.Index(fields=['status', 'appointment_date']),
+        ]
+
     def __str__(self):
         return f"{self.client.username} - {self.service.title} on {self.appointment_date}"
 
@@ -100,9 +308,107 @@ class Appointment(models.Model):
         """Soft delete the appointment by setting is_deleted to True."""
         self.is_deleted = True
         self.save()
-    
 
-class Payment(models.Model):
+    @property
+    def is_open(self):
+        """Return True if the appointment may still be moved or canceled."""
+        return self.status in self.OPEN_STATUSES
+
+    def can_transition_to(self, status):
+        """Return True if the appointment may move from its current status to ``status``."""
+        return status in self.STATUS_TRANSITIONS.get(self.status, set())
+
+    def transition_to(self, status, changed_by=None, note=''):
+        """
+        Moves the appointment to a new status and records the change in its history.
+
+        The update only applies if the status is still the one this instance holds,
+        so two concurrent transitions of the same appointment cannot both succeed.
+
+        Args:
+            status (str): The new status.
+            changed_by (User): The user making the change, if any.
+            note (str): An optional note stored with the history entry.
+
+        Returns:
+            AppointmentStatusHistory: The recorded history entry.
+
+        Raises:
+            InvalidStatusTransition: If the move is not allowed or the status changed concurrently.
+        """
+        if not self.can_transition_to(status):
+            raise InvalidStatusTransition(
+                f"An appointment cannot move from {self.status!r} to {status!r}."
+            )
+        now = timezone.now()
+        with transaction.atomic(using=router.db_for_write(Appointment)):
+            updated = Appointment.all_objects.filter(pk=self.pk, status=self.status).update(
+                status=status, updated_at=now
+            )
+            if not updated:
+                raise InvalidStatusTransition("The appointment status was changed by someone else.")
+            entry = AppointmentStatusHistory.objects.create(
+                appointment=self,
+                from_status=self.status,
+                to_status=status,
+                changed_at=now,
+                changed_by=changed_by,
+                note=note,
+            )
+        self.status = status
+        self.updated_at = now
+        return entry
+
+
+class InvalidStatusTransition(ValidationError):
+    """Raised when an appointment is moved to a status its current status does not allow."""
+
+
+class AppointmentStatusHistory(models.Model):
+    """
+    An append-only record of an appointment status change.
+
+    Attributes:
+        appointment (ForeignKey): The appointment whose status changed. The entry outlives the appointment row.
+        from_status (CharField): The status before the change.
+        to_status (CharField): The status after the change.
+        changed_at (DateTimeField): The date and time of the change.
+        changed_by (ForeignKey): The user who made the change, or None for automated changes.
+        note (CharField): An optional note about the change.
+
+    Methods:
+        save(*args, **kwargs): Refuses to modify an existing entry.
+        delete(*args, **kwargs): Refuses to delete an entry.
+        __str__(): Returns a string representation of the change.
+    """
+    # Deleting an appointment row (e.g. with its client or service) keeps its history, which
+    # still names it by ``appointment_id``; there is no database constraint to block the delete.
+    appointment = models.ForeignKey(
+        Appointment, on_delete=models.DO_NOTHING, db_constraint=False, related_name='status_history'
+    )
+    from_status = models.CharField(max_length=10, choices=Appointment.STATUS_CHOICES)
+    to_status = models.CharField(max_length=10, choices=Appointment.STATUS_CHOICES)
+    changed_at = models.DateTimeField(default=timezone.now, db_index=True)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True)
+    note = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'appointment status history'
+        ordering = ['changed_at']
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Appointment status history is append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Appointment status history is append-only.")
+
+    def __str__(self):
+        return f"{self.appointment_id}: {self.from_status} -> {self.to_status} at {self.changed_at}"
+
+
+class Payment(TenantScopedModel):
     """
     Represents a payment made for an appointment at the nail salon.
     Attributes:
@@ -154,6 +460,81 @@ class Notification(models.Model):
         return f"{self.reminder_type.capitalize()} reminder for {self.appointment}"
 
 
+class CalendarFeedKey(models.Model):
+    """
+    The revocation counter of the calendar feed URLs issued to a user.
+
+    Every feed token carries the generation it was issued with and stops working once the
+    generation is incremented, so a user can revoke leaked URLs by resetting them.
+
+    Attributes:
+        user (OneToOneField): The user the feed URLs are issued to.
+        generation (PositiveIntegerField): The generation of the URLs currently valid.
+
+    Methods:
+        __str__(): Returns a string representation of the key.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='calendar_feed_key')
+    generation = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f"Calendar feeds of {self.user.username} (generation {self.generation})"
+
+
+class ServiceDemandForecast(TenantScopedModel):
+    """
+    The precomputed demand of a service, written by the ``compute_forecasts`` command.
+
+    Attributes:
+        service (OneToOneField): The service the forecast is for.
+        curve (JSONField): The average number of appointments per week for each of the 168 hours of the week, Monday 00:00 first.
+        busiest (JSONField): Labels of the busiest hours of the week, such as ``'Sat 14:00'``, busiest first.
+        computed_at (DateTimeField): The date and time when the forecast was computed.
+
+    Methods:
+        __str__(): Returns a string representation of the forecast.
+    """
+    service = models.OneToOneField(Service, on_delete=models.CASCADE, related_name='demand_forecast')
+    curve = models.JSONField()
+    busiest = models.JSONField()
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Demand of {self.service.title}"
+
+
+class ClientReliability(TenantScopedModel):
+    """
+    The precomputed cancel, no-show and deposit rates of a client at a salon, written by ``compute_forecasts``.
+
+    Attributes:
+        client (ForeignKey): The client the rates are for.
+        appointments (PositiveIntegerField): The number of past appointments the rates are computed from.
+        cancel_rate (FloatField): The share of the appointments the client canceled.
+        no_show_rate (FloatField): The share of the appointments the client didn't show up to.
+        deposit_rate (FloatField): The share of the appointments with a reservation payment.
+        computed_at (DateTimeField): The date and time when the rates were computed.
+
+    Methods:
+        __str__(): Returns a string representation of the rates.
+    """
+    client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reliability')
+    appointments = models.PositiveIntegerField()
+    cancel_rate = models.FloatField()
+    no_show_rate = models.FloatField()
+    deposit_rate = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = 'client reliability'
+        constraints = [
+            models.UniqueConstraint(fields=['salon', 'client'], name='unique_client_reliability_per_salon'),
+        ]
+
+    def __str__(self):
+        return f"Reliability of {self.client.username}"
+
+
 def create_appointment_with_initial_payment(client, service, appointment_date, reservation_fee):
     """
     Creates an appointment with an initial reservation payment.
@@ -169,6 +550,7 @@ def create_appointment_with_initial_payment(client, service, appointment_date, r
     """
     with transaction.atomic():
         appointment = Appointment.objects.create(
+            salon_id=service.salon_id,
             client=client,
             service=service,
             appointment_date=appointment_date,
@@ -176,8 +558,168 @@ def create_appointment_with_initial_payment(client, service, appointment_date, r
             status='reserved'
         )
         Payment.objects.create(
+            salon_id=appointment.salon_id,
             appointment=appointment,
             amount=reservation_fee,
             payment_type='reservation'
         )
-    return appointment
\ No newline at end of file
+    return appointment
+
+
+def bulk_transition_appointments(queryset, status, note=''):
+    """
+    Moves every appointment of a queryset that may reach ``status`` to it, set-based.
+
+    For each source status allowed to move to ``status``, the appointments are moved
+    with one ``UPDATE`` that stamps ``updated_at`` with a value unique to that source
+    status, then the history entries of exactly the rows it moved are written with one
+    ``INSERT ... SELECT`` on that stamp. A concurrent ``transition_to()`` either moves
+    a row before the ``UPDATE``, which then skips it, or fails after it, so the history
+    never records a move that didn't happen. No rows are loaded into Python.
+    Appointments whose status does not allow the move are left untouched.
+
+    Args:
+        queryset (QuerySet): The appointments to move.
+        status (str): The new status.
+        note (str): An optional note stored with the history entries.
+
+    Returns:
+        dict: The number of appointments moved, keyed by their previous status.
+    """
+    using = router.db_for_write(Appointment)
+    queryset = queryset.using(using).order_by()
+    history_table = AppointmentStatusHistory._meta.db_table
+    connection = connections[using]
+    now = timezone.now()
+    moved = {}
+    with transaction.atomic(using=using):
+        for index, (from_status, targets) in enumerate(Appointment.STATUS_TRANSITIONS.items()):
+            if status not in targets:
+                continue
+            stamp = now + timedelta(microseconds=index)
+            moved[from_status] = queryset.filter(status=from_status).update(status=status, updated_at=stamp)
+            if not moved[from_status]:
+                continue
+            rows = Appointment.all_objects.using(using).filter(status=status, updated_at=stamp).annotate(
+                history_from=models.Value(from_status, output_field=models.CharField()),
+                history_to=models.Value(status, output_field=models.CharField()),
+                history_at=models.Value(stamp, output_field=models.DateTimeField()),
+                history_note=models.Value(note, output_field=models.CharField()),
+            ).values_list('pk', 'history_from', 'history_to', 'history_at', 'history_note')
+            select_sql, params = rows.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {connection.ops.quote_name(history_table)} "
+                    f"(appointment_id, from_status, to_status, changed_at, note) {select_sql}",
+                    params,
+                )
+    return moved
+
+
+# How long an appointment occupies its client.
+APPOINTMENT_DURATION = timedelta(hours=1)
+
+SeriesBooking = namedtuple('SeriesBooking', ['series', 'appointments', 'conflicts'])
+
+
+def find_conflicts(client, dates, exclude=None):
+    """
+    Returns the dates overlapping an open appointment of the client.
+
+    This is the only capacity rule, applied to single and recurring bookings alike:
+    a client cannot hold two appointments less than ``APPOINTMENT_DURATION`` apart.
+    The salon's own capacity is not modelled, so different clients may book the
+    same service at the same time.
+
+    All dates are checked with a single query covering only the windows around them.
+
+    Args:
+        client (User): The client booking the appointments.
+        dates (list[datetime]): The requested appointment dates.
+        exclude (QuerySet): Appointments to ignore, e.g. the ones being moved.
+
+    Returns:
+        list[datetime]: The requested dates that conflict, in the order given.
+    """
+    if not dates:
+        return []
+    windows = models.Q()
+    for date in dates:
+        windows |= models.Q(
+            appointment_date__gt=date - APPOINTMENT_DURATION,
+            appointment_date__lt=date + APPOINTMENT_DURATION,
+        )
+    taken = Appointment.objects.filter(windows, client=client, is_deleted=False).exclude(status='canceled')
+    if exclude is not None:
+        taken = taken.exclude(pk__in=exclude.values('pk'))
+    taken = sorted(taken.values_list('appointment_date', flat=True))
+
+    conflicts = []
+    for date in dates:
+        index = bisect.bisect_right(taken, date - APPOINTMENT_DURATION)
+        if index < len(taken) and taken[index] < date + APPOINTMENT_DURATION:
+            conflicts.append(date)
+    return conflicts
+
+
+def create_recurring_series(client, service, start_date, frequency, occurrences, reservation_fee,
+                            allow_partial=True):
+    """
+    Books a recurring series with a reservation payment for every occurrence.
+
+    All occurrences are checked for conflicts with one query, then the appointments
+    and their reservation payments are inserted with ``bulk_create`` in a single transaction.
+
+    Args:
+        client (User): The user booking the series.
+        service (Service): The service booked at every occurrence.
+        start_date (datetime): The date and time of the first occurrence.
+        frequency (str): One of ``AppointmentSeries.FREQUENCY_CHOICES``.
+        occurrences (int): The number of occurrences to book.
+        reservation_fee (Decimal): The reservation fee paid for every occurrence.
+        allow_partial (bool): Book the free occurrences when some conflict, instead of none.
+
+    Returns:
+        SeriesBooking: The series, the booked appointments and the conflicting dates that were skipped.
+
+    Raises:
+        ValidationError: If occurrences conflict and ``allow_partial`` is False, or none is free.
+    """
+    using = router.db_for_write(Appointment)
+    with transaction.atomic(using=using):
+        series = AppointmentSeries(
+            client=client, service=service, frequency=frequency, start_date=start_date,
+            occurrences=occurrences, reservation_fee=reservation_fee, salon_id=service.salon_id,
+        )
+        dates = series.occurrence_dates()
+        conflicts = find_conflicts(client, dates)
+        if conflicts and (not allow_partial or len(conflicts) == len(dates)):
+            raise ValidationError(
+                "You already have appointments on these dates: "
+                + ", ".join(f"{conflict:%Y-%m-%d %H:%M}" for conflict in conflicts) + "."
+            )
+        series.save()
+
+        conflicting = set(conflicts)
+        appointments = Appointment.objects.bulk_create([
+            Appointment(
+                salon_id=series.salon_id,
+                client=client,
+                service=service,
+                series=series,
+                appointment_date=date,
+                reservation_fee=reservation_fee,
+                status='reserved',
+            )
+            for date in dates if date not in conflicting
+        ])
+        Payment.objects.bulk_create([
+            Payment(
+                salon_id=appointment.salon_id,
+                appointment=appointment,
+                amount=reservation_fee,
+                payment_type='reservation',
+            )
+            for appointment in appointments
+        ])
+    return SeriesBooking(series, appointments, conflicts)
@@ -0,0 +1,125 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .tenancy import ensure_tenant_database, get_current_salon
+
+# Set by ReplicaPinningMiddleware for the duration of a request.
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+_request_writes = ContextVar('request_writes', default=None)
+
+# The salon registry, which lives in the default database next to the users.
+REGISTRY_MODELS = {'services.Salon', 'services.Salon_staff'}
+
+
+@contextmanager
+def primary_reads():
+    """
+    Sends every read of the enclosed block to the primary database.
+
+    Example:
+        >>> with primary_reads():
+        ...     Payment.objects.filter(appointment=appointment).exists()
+    """
+    token = _pinned_to_primary.set(True)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(token)
+
+
+@contextmanager
+def track_writes():
+    """
+    Records whether the enclosed block writes to the primary database.
+
+    Yields:
+        dict: ``{'wrote': bool}``, updated as writes are routed.
+    """
+    writes = {'wrote': False}
+    token = _request_writes.set(writes)
+    try:
+        yield writes
+    finally:
+        _request_writes.reset(token)
+
+
+class TenantRouter:
+    """
+    Routes the queries of the active salon to the salon's database or shard.
+
+    The salon registry itself (``Salon`` and its staff) always lives in the default database.
+    Salons whose ``db_alias`` is the default database are left to the next router.
+    """
+
+    def _tenant_db(self, model):
+        if model._meta.label in REGISTRY_MODELS:
+            return None
+        salon = get_current_salon()
+        if salon is None or salon.db_alias == DEFAULT_DB_ALIAS:
+            return None
+        ensure_tenant_database(salon.db_alias)
+        return salon.db_alias
+
+    def db_for_read(self, model, **hints):
+        return self._tenant_db(model)
+
+    def db_for_write(self, model, **hints):
+        return self._tenant_db(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Rows point to their salon across databases (the FK has no database constraint).
+        if REGISTRY_MODELS.intersection((obj1._meta.label, obj2._meta.label)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == 'services' and model_name == 'salon':
+            return db == DEFAULT_DB_ALIAS
+        return None
+
+
+class ReplicaRouter:
+    """
+    Sends reads to the replicas listed in ``DATABASE_REPLICAS`` and writes to the primary.
+
+    Reads stay on the primary while ``primary_reads()`` is active, inside a transaction,
+    and once the current request has written, so users always see their own writes.
+    ``ReplicaPinningMiddleware`` extends that to the next requests for ``REPLICA_PIN_SECONDS``.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas:
+            return None
+        writes = _request_writes.get()
+        if (
+            _pinned_to_primary.get()
+            or (writes is not None and writes['wrote'])
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if not settings.DATABASE_REPLICAS:
+            return None
+        writes = _request_writes.get()
+        if writes is not None:
+            writes['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema from the primary.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,15 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def add_class(field, css_class):
+    """
+    Renders a bound form field with an extra CSS class on its widget.
+
+    Example:
+        {{ form.title|add_class:"form-control" }}
+    """
+    classes = field.field.widget.attrs.get('class', '')
+    return field.as_widget(attrs={'class': f'{classes} {css_class}'.strip()})
@@ -0,0 +1,17 @@
+from django import template
+from django.utils.html import format_html
+
+from services.idempotency import IDEMPOTENCY_FIELD, new_idempotency_key
+
+register = template.Library()
+
+
+@register.simple_tag
+def idempotency_key_field():
+    """
+    Renders a hidden input carrying a fresh idempotency key.
+
+    A new key is issued every time the form is rendered, so resubmitting a corrected
+    form is a new request while double submits of the same form are collapsed.
+    """
+    return format_html('<input type="hidden" name="{}" value="{}">', IDEMPOTENCY_FIELD, new_idempotency_key())
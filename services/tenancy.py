@@ -0,0 +1,118 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections, models
+
+_current_salon = ContextVar('current_salon', default=None)
+_database_lock = threading.Lock()
+
+
+def get_current_salon():
+    """
+    Returns the salon the current request or task is running for.
+
+    Returns:
+        Salon | None: The active salon, or None outside of a tenant context.
+    """
+    return _current_salon.get()
+
+
+def set_current_salon(salon):
+    """
+    Activates a salon for the current context.
+
+    Returns:
+        Token: A token to pass to ``reset_current_salon`` to restore the previous salon.
+    """
+    return _current_salon.set(salon)
+
+
+def reset_current_salon(token):
+    """Restores the salon that was active before ``set_current_salon``."""
+    _current_salon.reset(token)
+
+
+@contextmanager
+def tenant_context(salon):
+    """
+    Runs a block of code on behalf of a salon.
+
+    Example:
+        >>> with tenant_context(salon):
+        ...     Appointment.objects.count()  # Only this salon's appointments.
+    """
+    token = set_current_salon(salon)
+    try:
+        yield salon
+    finally:
+        reset_current_salon(token)
+
+
+def register_sqlite_database(alias, name):
+    """
+    Registers an SQLite database under a new alias at runtime.
+
+    Args:
+        alias (str): The database alias to register.
+        name (Path | str): The path of the SQLite file.
+    """
+    databases = {
+        DEFAULT_DB_ALIAS: connections.settings[DEFAULT_DB_ALIAS],
+        alias: {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': name,
+            'CONN_MAX_AGE': connections.settings[DEFAULT_DB_ALIAS]['CONN_MAX_AGE'],
+        },
+    }
+    connections.settings[alias] = connections.configure_settings(databases)[alias]
+
+
+def ensure_tenant_database(alias):
+    """
+    Makes sure a database alias used by a salon is configured.
+
+    Aliases listed in ``DATABASES`` are used as is. Any other alias is registered
+    at runtime as an SQLite file named after the alias in ``TENANT_DATABASE_DIR``.
+
+    Args:
+        alias (str): The database alias of the salon.
+
+    Returns:
+        bool: True if the alias had to be registered.
+    """
+    if alias in connections.settings:
+        return False
+    with _database_lock:
+        if alias in connections.settings:
+            return False
+        database_dir = Path(settings.TENANT_DATABASE_DIR)
+        database_dir.mkdir(parents=True, exist_ok=True)
+        register_sqlite_database(alias, database_dir / f'{alias}.sqlite3')
+    return True
+
+
+def migrate_tenant_database(alias, verbosity=0):
+    """Registers the database of a salon if needed and applies all migrations to it."""
+    ensure_tenant_database(alias)
+    call_command('migrate', database=alias, verbosity=verbosity, interactive=False)
+
+
+class TenantManager(models.Manager):
+    """
+    Manager that only returns the rows of the active salon.
+
+    Outside of a tenant context (management commands, the admin, single-salon deployments)
+    every row is returned; ``TenantMiddleware`` refuses the other requests that resolve
+    no salon. Use ``all_objects`` to query across salons on purpose.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        salon = get_current_salon()
+        if salon is not None:
+            queryset = queryset.filter(salon_id=salon.pk)
+        return queryset
@@ -1,3 +1,698 @@
-from django.test import TestCase
+import sqlite3
+import tempfile
+from collections import Counter
+from io import StringIO
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, Group, User
+from django.core.cache import cache, caches
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .calendar_feeds import _escape, _fold, make_feed_token
+from .catalog import _catalog_version_key, get_catalog
+from .forecasts import get_client_reliability, get_service_demand
+from .forms import AppointmentForm
+from .idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER, idempotent
+from .middleware import TenantMiddleware
+from .models import (
+    Appointment, AppointmentStatusHistory, ClientReliability, InvalidStatusTransition, Payment, Salon, Service,
+    ServiceDemandForecast, bulk_transition_appointments, create_recurring_series, find_conflicts,
+)
+from .routers import primary_reads
+from .tenancy import register_sqlite_database, tenant_context
+from .throttling import MemoryBucketStore, parse_rate
+from . import throttling
+from .warmup import WarmupError, compile_templates, prime_catalogs
+
+
+class WarmupTests(TestCase):
+    def test_project_templates_compile(self):
+        self.assertGreater(compile_templates(), 0)
+
+    def test_broken_template_does_not_stop_the_others(self):
+        with tempfile.TemporaryDirectory() as template_dir:
+            (Path(template_dir) / 'good.html').write_text('{{ value }}')
+            (Path(template_dir) / 'broken.html').write_text('{{ value|no_such_filter }}')
+            templates = [{
+                'BACKEND': 'django.template.backends.django.DjangoTemplates',
+                'DIRS': [template_dir],
+            }]
+            with override_settings(BASE_DIR=Path(template_dir), TEMPLATES=templates), \
+                    self.assertLogs('services.warmup', 'ERROR'), self.assertRaises(WarmupError) as raised:
+                compile_templates()
+        self.assertIn('broken.html', str(raised.exception))
+        self.assertNotIn('good.html', str(raised.exception))
+
+    def test_catalog_of_every_salon_is_primed(self):
+        cache.clear()
+        salons = [Salon.objects.create(name=name, slug=name) for name in ('salon-a', 'salon-b')]
+        for salon in salons:
+            Service.objects.create(salon=salon, title=salon.name, description='', price=20)
+        prime_catalogs()
+        for salon in salons:
+            with tenant_context(salon), self.assertNumQueries(0):
+                self.assertEqual([service.title for service in get_catalog()], [salon.name])
+
+
+class CatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.service = Service.objects.create(title='Manicure', description='Classic manicure', price=20)
+
+    def test_catalog_is_cached(self):
+        get_catalog()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_catalog(), [self.service])
+
+    def test_saved_and_deleted_services_are_seen(self):
+        get_catalog()
+        self.service.title = 'Pedicure'
+        self.service.save()
+        self.assertEqual(get_catalog()[0].title, 'Pedicure')
+        gel = Service.objects.create(title='Gel polish', description='Gel polish', price=30)
+        self.assertEqual(len(get_catalog()), 2)
+        gel.delete()
+        self.assertEqual(get_catalog(), [self.service])
+
+    def test_lost_version_does_not_revive_an_old_catalog(self):
+        get_catalog()
+        # Another worker edits the catalog, then the version is evicted from the shared cache.
+        Service.objects.create(title='Gel polish', description='Gel polish', price=30)
+        cache.delete(_catalog_version_key(None))
+        self.assertEqual(len(get_catalog()), 2)
+
+
+class TenantIsolationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.salon_a = Salon.objects.create(name='Salon A', slug='salon-a')
+        self.salon_b = Salon.objects.create(name='Salon B', slug='salon-b', domain='salon-b.example.com')
+        self.service_a = Service.objects.create(salon=self.salon_a, title='A', description='A', price=20)
+        self.service_b = Service.objects.create(salon=self.salon_b, title='B', description='B', price=20)
+
+    def booking_url(self, service):
+        return reverse('appointment_create', args=[service.id])
+
+    def test_salon_resolved_from_path(self):
+        response = self.client.get('/s/salon-a/')
+        self.assertContains(response, f'/s/salon-a{self.booking_url(self.service_a)}')
+        self.assertNotContains(response, self.booking_url(self.service_b))
+
+    @override_settings(ALLOWED_HOSTS=['salon-b.example.com'])
+    def test_salon_resolved_from_host(self):
+        response = self.client.get('/', HTTP_HOST='salon-b.example.com')
+        self.assertContains(response, self.booking_url(self.service_b))
+        self.assertNotContains(response, self.booking_url(self.service_a))
+
+    def test_unresolved_salon_is_refused(self):
+        self.assertEqual(self.client.get('/').status_code, 404)
+        self.assertEqual(self.client.get('/s/unknown/').status_code, 404)
+
+    @override_settings(TENANT_ALLOW_UNRESOLVED=True)
+    def test_unresolved_fallback_is_explicit(self):
+        self.assertEqual(self.client.get('/').status_code, 200)
+
+    def test_single_salon_deployment_needs_no_salon(self):
+        Salon.objects.all().delete()
+        self.assertEqual(self.client.get('/').status_code, 200)
+
+    def test_salon_changes_retire_cached_lookups(self):
+        self.assertEqual(self.client.get('/s/salon-c/').status_code, 404)
+        Salon.objects.create(name='Salon C', slug='salon-c')
+        self.assertEqual(self.client.get('/s/salon-c/').status_code, 200)
+        self.salon_a.slug = 'salon-a2'
+        self.salon_a.save()
+        self.assertEqual(self.client.get('/s/salon-a/').status_code, 404)
+
+    def test_single_salon_deployment_does_not_query_salons_per_request(self):
+        Salon.objects.all().delete()
+        middleware = TenantMiddleware(lambda request: HttpResponse())
+        middleware(RequestFactory().get('/'))
+        with self.assertNumQueries(0):
+            self.assertEqual(middleware(RequestFactory().get('/')).status_code, 200)
+
+    def test_other_salon_service_cannot_be_booked(self):
+        self.client.force_login(User.objects.create(username='client'))
+        response = self.client.get(f'/s/salon-a{self.booking_url(self.service_b)}')
+        self.assertEqual(response.status_code, 404)
+
+    def test_admins_only_manage_their_own_salon(self):
+        admin_user = User.objects.create(username='admin')
+        admin_user.groups.add(Group.objects.create(name='Admin'))
+        self.salon_a.staff.add(admin_user)
+        self.client.force_login(admin_user)
+        edit = reverse('service_update', args=[self.service_b.id])
+        data = {'title': 'Taken over', 'description': 'B', 'price': '1'}
+        self.assertEqual(self.client.get(f"/s/salon-a{reverse('service_create')}").status_code, 200)
+        self.assertEqual(self.client.get(f"/s/salon-b{reverse('service_create')}").status_code, 302)
+        self.assertEqual(self.client.post(f'/s/salon-b{edit}', data).status_code, 302)
+        self.client.post(f"/s/salon-b{reverse('service_create')}", data)
+        self.assertEqual(Service.all_objects.get(pk=self.service_b.pk).title, 'B')
+        self.assertFalse(Service.all_objects.filter(title='Taken over').exists())
+
+        self.salon_b.staff.add(admin_user)
+        response = self.client.post(f'/s/salon-b{edit}', data)
+        self.assertRedirects(response, '/s/salon-b/services/', fetch_redirect_response=False)
+        self.assertEqual(Service.all_objects.get(pk=self.service_b.pk).title, 'Taken over')
+
+    def test_rows_without_a_salon_are_assigned_when_switching(self):
+        Salon.objects.all().delete()
+        client = User.objects.create(username='client')
+        admin_user = User.objects.create(username='admin')
+        admin_user.groups.add(Group.objects.create(name='Admin'))
+        service = Service.objects.create(title='Manicure', description='Manicure', price=20)
+        Appointment.objects.create(
+            client=client, service=service, appointment_date=timezone.now(), reservation_fee=10,
+        )
+        call_command('assign_salon', 'main', name='Main', admins=True, stdout=StringIO())
+        salon = Salon.objects.get(slug='main')
+        self.assertEqual(Service.all_objects.get(pk=service.pk).salon, salon)
+        self.assertFalse(Appointment.all_objects.filter(salon__isnull=True).exists())
+        self.assertTrue(salon.has_staff(admin_user))
+        self.assertContains(self.client.get('/s/main/'), 'Manicure')
+
+    def test_appointment_form_lists_active_salon_services(self):
+        with tenant_context(self.salon_a):
+            choices = list(AppointmentForm().fields['service'].queryset)
+        self.assertEqual(choices, [self.service_a])
+
+
+REPLICA_ALIAS = 'replica'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA_ALIAS], REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Reads are routed to a second SQLite file that only receives the test database
+    when ``replicate()`` copies it, which simulates replication lag. Rows must be
+    committed to be copied, hence the TransactionTestCase.
+    """
+
+    # The replica is registered before the class is set up, so '__all__' covers it.
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        cls.replica_path = Path(cls.replica_dir.name) / 'replica.sqlite3'
+        register_sqlite_database(REPLICA_ALIAS, cls.replica_path)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA_ALIAS].close()
+        del connections[REPLICA_ALIAS]
+        del connections.settings[REPLICA_ALIAS]
+        cls.replica_dir.cleanup()
+
+    def setUp(self):
+        cache.clear()
+        with primary_reads():
+            self.user = User.objects.create(username='client')
+            self.service = Service.objects.create(title='Manicure', description='Manicure', price=20)
+            self.client.force_login(self.user)
+        self.replicate()
+
+    def replicate(self):
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        target = sqlite3.connect(self.replica_path)
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+
+    def count_queries(self):
+        queries = Counter()
+
+        def counter(alias):
+            def wrapper(execute, sql, params, many, context):
+                queries[alias] += 1
+                return execute(sql, params, many, context)
+            return wrapper
+
+        for alias in (DEFAULT_DB_ALIAS, REPLICA_ALIAS):
+            wrapper = connections[alias].execute_wrapper(counter(alias))
+            wrapper.__enter__()
+            self.addCleanup(wrapper.__exit__, None, None, None)
+        return queries
+
+    def test_reads_go_to_the_replica(self):
+        Service.objects.create(title='Pedicure', description='Pedicure', price=30)
+        self.assertEqual(Service.objects.count(), 1)
+        with primary_reads():
+            self.assertEqual(Service.objects.count(), 2)
+        with transaction.atomic():
+            self.assertEqual(Service.objects.count(), 2)
+        self.replicate()
+        self.assertEqual(Service.objects.count(), 2)
+
+    def test_pages_are_served_from_the_replica(self):
+        queries = self.count_queries()
+        self.client.get(reverse('home'))
+        self.client.get(reverse('client_dashboard'))
+        self.assertEqual(queries[DEFAULT_DB_ALIAS], 0)
+        self.assertGreater(queries[REPLICA_ALIAS], 0)
+
+    def test_client_reads_its_own_writes(self):
+        response = self.client.post(reverse('appointment_create', args=[self.service.id]), {
+            'service': self.service.id,
+            'appointment_date': '2030-01-01T10:00',
+            'reservation_fee': '10',
+        })
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        appointment = Appointment.objects.using(DEFAULT_DB_ALIAS).get()
+        row = f'<td>{appointment.id}</td>'
+        self.assertContains(self.client.get(reverse('client_dashboard')), row)
+
+        # Once the pin has expired, the dashboard reads the lagging replica again.
+        self.client.cookies.pop(settings.REPLICA_PIN_COOKIE)
+        self.assertNotContains(self.client.get(reverse('client_dashboard')), row)
+        self.replicate()
+        self.assertContains(self.client.get(reverse('client_dashboard')), row)
+
+
+class StatusTransitionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='client')
+        self.service = Service.objects.create(title='Manicure', description='Manicure', price=20)
+
+    def book(self, status='reserved'):
+        return Appointment.objects.create(
+            client=self.user, service=self.service, appointment_date=timezone.now(),
+            reservation_fee=10, status=status,
+        )
+
+    def test_transition_is_recorded(self):
+        appointment = self.book()
+        appointment.transition_to('confirmed', changed_by=self.user, note='Called the client.')
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, 'confirmed')
+        entry = appointment.status_history.get()
+        self.assertEqual((entry.from_status, entry.to_status, entry.changed_by), ('reserved', 'confirmed', self.user))
+
+    def test_invalid_transition_is_refused(self):
+        appointment = self.book('completed')
+        with self.assertRaises(InvalidStatusTransition):
+            appointment.transition_to('reserved')
+        self.assertFalse(appointment.status_history.exists())
+
+    def test_concurrent_transition_is_refused(self):
+        appointment = self.book()
+        Appointment.objects.get(pk=appointment.pk).transition_to('canceled')
+        with self.assertRaises(InvalidStatusTransition):
+            appointment.transition_to('confirmed')
+        self.assertEqual(Appointment.objects.get(pk=appointment.pk).status, 'canceled')
+
+    def test_bulk_transition_skips_disallowed_statuses(self):
+        reserved, confirmed, canceled = self.book(), self.book('confirmed'), self.book('canceled')
+        moved = bulk_transition_appointments(Appointment.objects.all(), 'completed', note='Day closed.')
+        self.assertEqual(moved, {'reserved': 1, 'confirmed': 1})
+        self.assertEqual(
+            dict(Appointment.objects.values_list('pk', 'status')),
+            {reserved.pk: 'completed', confirmed.pk: 'completed', canceled.pk: 'canceled'},
+        )
+        self.assertEqual(
+            set(AppointmentStatusHistory.objects.values_list('appointment_id', 'from_status', 'to_status')),
+            {(reserved.pk, 'reserved', 'completed'), (confirmed.pk, 'confirmed', 'completed')},
+        )
+
+    def test_bulk_transition_only_records_the_rows_it_moved(self):
+        earlier = self.book()
+        earlier.transition_to('completed')
+        self.book()
+        moved = bulk_transition_appointments(Appointment.objects.all(), 'completed')
+        self.assertEqual(moved, {'reserved': 1, 'confirmed': 0})
+        self.assertEqual(AppointmentStatusHistory.objects.filter(appointment=earlier).count(), 1)
+        self.assertEqual(AppointmentStatusHistory.objects.count(), 2)
+
+    def test_history_is_append_only(self):
+        appointment = self.book()
+        entry = appointment.transition_to('confirmed')
+        with self.assertRaises(ValueError):
+            entry.delete()
+
+    def test_history_does_not_block_deleting_clients_and_services(self):
+        appointment = self.book()
+        entry = appointment.transition_to('confirmed')
+        self.user.delete()
+        self.assertFalse(Appointment.all_objects.exists())
+        self.assertEqual(AppointmentStatusHistory.objects.get().appointment_id, entry.appointment_id)
+        self.service.delete()
+
+    def test_admin_changes_status_through_transitions(self):
+        admin_user = User.objects.create_superuser(username='admin', password='secret')
+        self.client.force_login(admin_user)
+        reserved, completed = self.book(), self.book('completed')
+        changelist = reverse('admin:services_appointment_changelist')
+        self.client.post(changelist, {'action': 'mark_confirmed', '_selected_action': [reserved.pk, completed.pk]})
+        self.assertEqual(Appointment.objects.get(pk=reserved.pk).status, 'confirmed')
+        self.assertEqual(Appointment.objects.get(pk=completed.pk).status, 'completed')
+        self.assertEqual(reserved.status_history.get().changed_by, admin_user)
+
+        change = reverse('admin:services_appointment_change', args=[reserved.pk])
+        self.client.post(change, {
+            'client': self.user.pk, 'service': self.service.pk, 'status': 'reserved',
+            'appointment_date_0': '2030-01-01', 'appointment_date_1': '10:00:00', 'reservation_fee': '10',
+            'status_history-TOTAL_FORMS': '1', 'status_history-INITIAL_FORMS': '1',
+            'status_history-0-id': reserved.status_history.get().pk, 'status_history-0-appointment': reserved.pk,
+        })
+        reserved.refresh_from_db()
+        self.assertEqual((reserved.appointment_date.year, reserved.status), (2030, 'confirmed'))
+
+
+class ConflictTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='client')
+        self.service = Service.objects.create(title='Manicure', description='Manicure', price=20)
+        self.ten = datetime(2030, 1, 7, 10, tzinfo=dt_timezone.utc)
+        self.book(self.user, self.ten)
+
+    def book(self, client, date, status='reserved'):
+        return Appointment.objects.create(
+            client=client, service=self.service, appointment_date=date, reservation_fee=10, status=status,
+        )
+
+    def test_overlapping_dates_conflict(self):
+        dates = [self.ten + timedelta(minutes=minutes) for minutes in (-60, -30, 0, 59, 60, 24 * 60)]
+        self.assertEqual(find_conflicts(self.user, dates), dates[1:4])
+
+    def test_other_clients_and_canceled_appointments_do_not_conflict(self):
+        other = User.objects.create(username='other')
+        self.book(self.user, self.ten + timedelta(hours=2), status='canceled')
+        self.assertEqual(find_conflicts(other, [self.ten]), [])
+        self.assertEqual(find_conflicts(self.user, [self.ten + timedelta(hours=2)]), [])
+
+    def test_series_skips_conflicting_occurrences(self):
+        booking = create_recurring_series(self.user, self.service, self.ten - timedelta(weeks=1), 'weekly', 3, 10)
+        self.assertEqual(booking.conflicts, [self.ten])
+        self.assertEqual(len(booking.appointments), 2)
+        with self.assertRaises(ValidationError):
+            create_recurring_series(self.user, self.service, self.ten, 'weekly', 3, 10, allow_partial=False)
+
+    def test_single_booking_follows_the_same_rule(self):
+        self.client.force_login(self.user)
+        data = {'service': self.service.id, 'appointment_date': '2030-01-07T10:30', 'reservation_fee': '10'}
+        response = self.client.post(reverse('appointment_create', args=[self.service.id]), data)
+        self.assertContains(response, "You already have an appointment at this time.")
+        self.client.force_login(User.objects.create(username='other'))
+        response = self.client.post(reverse('appointment_create', args=[self.service.id]), data)
+        self.assertRedirects(response, reverse('client_dashboard'))
+
+
+class RecurringSeriesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='client')
+        self.service = Service.objects.create(title='Manicure', description='Manicure', price=20)
+        self.start = datetime(2030, 1, 7, 10, tzinfo=dt_timezone.utc)
+        self.series = create_recurring_series(self.user, self.service, self.start, 'weekly', 4, 10).series
+
+    def dates(self):
+        return list(self.series.appointments.order_by('appointment_date').values_list('appointment_date', 'status'))
+
+    def test_cancel_this_and_future(self):
+        self.series.appointments.filter(appointment_date=self.start + timedelta(weeks=3)).update(status='completed')
+        self.assertEqual(self.series.cancel_from(self.start + timedelta(weeks=1)), 2)
+        self.assertEqual([status for _, status in self.dates()], ['reserved', 'canceled', 'canceled', 'completed'])
+        self.assertEqual(AppointmentStatusHistory.objects.filter(to_status='canceled').count(), 2)
+
+    def test_reschedule_this_and_future(self):
+        self.assertEqual(self.series.reschedule_from(self.start + timedelta(weeks=1), timedelta(hours=2)), 3)
+        self.assertEqual([date for date, _ in self.dates()], [self.start] + [
+            self.start + timedelta(weeks=week, hours=2) for week in (1, 2, 3)
+        ])
+
+    def test_reschedule_onto_own_occurrences_is_allowed(self):
+        self.assertEqual(self.series.reschedule_from(self.start, timedelta(weeks=1)), 4)
+        self.assertEqual(self.dates()[0][0], self.start + timedelta(weeks=1))
+
+    def test_conflicting_reschedule_is_refused(self):
+        Appointment.objects.create(
+            client=self.user, service=self.service, reservation_fee=10,
+            appointment_date=self.start + timedelta(weeks=2, hours=1),
+        )
+        with self.assertRaisesMessage(ValidationError, '2030-01-21 11:00'):
+            self.series.reschedule_from(self.start + timedelta(weeks=1), timedelta(hours=1))
+        self.assertEqual([date for date, _ in self.dates()], [self.start + timedelta(weeks=week) for week in range(4)])
+
+    def test_dashboard_cancels_open_occurrences(self):
+        self.client.force_login(self.user)
+        cancel = reverse('appointment_series_cancel', args=[self.series.appointments.earliest('appointment_date').pk])
+        self.assertContains(self.client.get(reverse('client_dashboard')), cancel)
+        self.assertRedirects(self.client.post(cancel), reverse('client_dashboard'))
+        self.assertEqual({status for _, status in self.dates()}, {'canceled'})
+        self.assertNotContains(self.client.get(reverse('client_dashboard')), cancel)
+
+
+class TokenBucketTests(SimpleTestCase):
+    def consume(self, store, now, capacity=3, refill_rate=1):
+        with mock.patch('services.throttling.time.monotonic', return_value=now):
+            return store.consume('key', capacity, refill_rate)
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('10/m'), (10, 10 / 60))
+        self.assertEqual(parse_rate('5/second'), (5, 5))
+
+    def test_burst_then_refill(self):
+        store = MemoryBucketStore()
+        self.assertEqual([self.consume(store, 100) for _ in range(3)], [0, 0, 0])
+        self.assertEqual(self.consume(store, 100), 1)
+        self.assertEqual(self.consume(store, 100.5), 0.5)
+        self.assertEqual(self.consume(store, 101), 0)
+        self.assertEqual(self.consume(store, 101), 1)
+
+    def test_refill_is_capped_at_capacity(self):
+        store = MemoryBucketStore()
+        self.consume(store, 100)
+        self.assertEqual([self.consume(store, 1000) for _ in range(3)], [0, 0, 0])
+        self.assertGreater(self.consume(store, 1000), 0)
+
+    def test_refused_request_takes_no_token(self):
+        store = MemoryBucketStore()
+        with mock.patch('services.throttling.time.monotonic', return_value=100):
+            self.assertEqual([store.consume_all(['a', 'b'], 2, 1) for _ in range(2)], [0, 0])
+            self.assertEqual(store.consume_all(['b', 'c'], 2, 1), 1)
+            self.assertEqual([store.consume('c', 2, 1) for _ in range(3)], [0, 0, 1])
+
+    def test_refilled_buckets_are_pruned(self):
+        store = MemoryBucketStore(max_keys=2)
+        with mock.patch('services.throttling.time.monotonic', return_value=100):
+            store.consume('a', 3, 1)
+            store.consume('b', 3, 1)
+        with mock.patch('services.throttling.time.monotonic', return_value=200):
+            store.consume('c', 3, 1)
+        self.assertEqual(list(store._buckets), ['c'])
+
+
+@override_settings(THROTTLE_ENABLED=True, THROTTLE_STORE='memory', THROTTLE_RATES={'login': '2/m'})
+class ThrottleMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        throttling._stores.clear()
+        self.addCleanup(throttling._stores.clear)
+
+    def test_writes_are_limited_per_client_ip(self):
+        statuses = [self.client.post(reverse('login'), REMOTE_ADDR='10.0.0.1').status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        response = self.client.post(reverse('login'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(self.client.post(reverse('login'), REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    @override_settings(TRUSTED_PROXIES=1)
+    def test_client_ip_is_read_behind_a_load_balancer(self):
+        def login(forwarded_for):
+            return self.client.post(reverse('login'), REMOTE_ADDR='10.1.0.1', HTTP_X_FORWARDED_FOR=forwarded_for)
+
+        self.assertEqual([login('203.0.113.1').status_code for _ in range(3)], [200, 200, 429])
+        self.assertEqual(login('203.0.113.2').status_code, 200)
+        # Addresses the client puts in the header itself are ignored.
+        self.assertEqual(login('198.51.100.9, 203.0.113.1').status_code, 429)
+
+    def test_user_refusal_spends_no_ip_token(self):
+        self.client.force_login(User.objects.create(username='client'))
+        for _ in range(2):
+            self.client.post(reverse('login'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(self.client.post(reverse('login'), REMOTE_ADDR='10.0.0.2').status_code, 429)
+        self.client.logout()
+        statuses = [self.client.post(reverse('login'), REMOTE_ADDR='10.0.0.2').status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    def test_reads_are_not_limited(self):
+        statuses = {self.client.get(reverse('login'), REMOTE_ADDR='10.0.0.1').status_code for _ in range(5)}
+        self.assertEqual(statuses, {200})
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+        @idempotent
+        def view(request):
+            self.calls += 1
+            return HttpResponse(f'call {self.calls}', status=201)
+
+        self.view = view
+
+    def post(self, key=None, data=None):
+        headers = {IDEMPOTENCY_HEADER: key} if key else {}
+        request = RequestFactory().post('/pay/', data or {}, headers=headers)
+        request.user = AnonymousUser()
+        return self.view(request)
+
+    def test_repeat_is_replayed(self):
+        first, second = self.post('key-1'), self.post('key-1')
+        self.assertEqual((second.status_code, second.content), (201, b'call 1'))
+        self.assertEqual(second[REPLAYED_HEADER], 'true')
+        self.assertFalse(first.has_header(REPLAYED_HEADER))
+        self.assertEqual(self.post('key-2').content, b'call 2')
+        self.assertEqual(self.calls, 2)
+
+    def test_key_reused_with_other_data_is_refused(self):
+        self.post('key-1', {'amount': '10', 'csrfmiddlewaretoken': 'a'})
+        self.assertEqual(self.post('key-1', {'amount': '10', 'csrfmiddlewaretoken': 'b'}).content, b'call 1')
+        response = self.post('key-1', {'amount': '99'})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.calls, 1)
+
+    def test_requests_without_key_always_run(self):
+        self.post()
+        self.post()
+        self.assertEqual(self.calls, 2)
+
+    def test_response_stored_while_taking_the_lock_is_replayed(self):
+        self.post('key-1')
+        # The duplicate misses the stored response, which the first request then stores
+        # before the duplicate takes the lock.
+        store = caches[settings.IDEMPOTENCY_CACHE_ALIAS]
+        real_get, lookups = store.get, []
+
+        def get(key, *args, **kwargs):
+            lookups.append(key)
+            return None if len(lookups) == 1 else real_get(key, *args, **kwargs)
+
+        with mock.patch.object(store, 'get', side_effect=get):
+            response = self.post('key-1')
+        self.assertEqual(response.content, b'call 1')
+        self.assertEqual(self.calls, 1)
+
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_booking_form_is_not_submitted_twice(self):
+        user = User.objects.create(username='client')
+        service = Service.objects.create(title='Manicure', description='Manicure', price=20)
+        self.client.force_login(user)
+        data = {
+            'service': service.id, 'appointment_date': '2030-01-01T10:00', 'reservation_fee': '10',
+            'idempotency_key': 'form-key',
+        }
+        first = self.client.post(reverse('appointment_create', args=[service.id]), data)
+        second = self.client.post(reverse('appointment_create', args=[service.id]), data)
+        self.assertEqual(second.status_code, first.status_code)
+        self.assertEqual(second[REPLAYED_HEADER], 'true')
+        data['appointment_date'] = '2030-01-02T10:00'
+        third = self.client.post(reverse('appointment_create', args=[service.id]), data)
+        self.assertEqual(third.status_code, 422)
+        self.assertEqual(Appointment.objects.filter(client=user).count(), 1)
+
+
+class ForecastTests(TestCase):
+    def setUp(self):
+        self.salon = Salon.objects.create(name='Salon A', slug='salon-a')
+        self.user = User.objects.create(username='client')
+        self.service = Service.objects.create(salon=self.salon, title='Manicure', description='Manicure', price=20)
+        saturday = datetime(2024, 6, 1, 14, tzinfo=dt_timezone.utc)
+        for week, status in enumerate(['completed', 'completed', 'canceled', 'no_show']):
+            appointment = Appointment.objects.create(
+                salon=self.salon, client=self.user, service=self.service, status=status,
+                appointment_date=saturday + timedelta(weeks=week), reservation_fee=10,
+            )
+            if week < 2:
+                Payment.objects.create(salon=self.salon, appointment=appointment, amount=10, payment_type='reservation')
+
+    def test_forecasts_are_stored_per_salon(self):
+        call_command('compute_forecasts', stdout=StringIO())
+        call_command('compute_forecasts', stdout=StringIO())
+        with tenant_context(self.salon):
+            self.assertEqual(get_client_reliability(self.user.pk), {
+                'appointments': 4, 'cancel_rate': 0.25, 'no_show_rate': 0.25, 'deposit_rate': 0.5,
+            })
+            self.assertEqual(get_service_demand(self.service.pk)['busiest'], ['Sat 14:00'])
+        self.assertEqual(ClientReliability.objects.get().salon, self.salon)
+        self.assertEqual(ServiceDemandForecast.objects.count(), 1)
+
+    def test_booking_page_shows_busiest_hours(self):
+        call_command('compute_forecasts', stdout=StringIO())
+        self.client.force_login(self.user)
+        response = self.client.get(f"/s/salon-a{reverse('appointment_create', args=[self.service.id])}")
+        self.assertContains(response, 'Busiest times for this service: Sat 14:00.')
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='client')
+        self.service = Service.objects.create(title='Manicure', description='Manicure', price=20)
+        Appointment.objects.create(
+            client=self.user, service=self.service, reservation_fee=10,
+            appointment_date=datetime(2030, 1, 7, 10, tzinfo=dt_timezone.utc),
+        )
+
+    def feed_url(self, kind='user'):
+        return reverse('calendar_feed', args=[make_feed_token(self.user, kind)])
+
+    def test_fold_and_escape(self):
+        line = 'SUMMARY:' + 'é' * 100
+        folded = _fold(line)
+        self.assertTrue(all(len(chunk.encode()) <= 75 for chunk in folded.split('\r\n')))
+        self.assertEqual(folded.replace('\r\n ', '').rstrip('\r\n'), line)
+        self.assertEqual(_escape('a;b,c\\d\ne'), 'a\\;b\\,c\\\\d\\ne')
+
+    def test_feed_is_served_and_revalidated(self):
+        response = self.client.get(self.feed_url())
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('DTSTART:20300107T100000Z', body)
+        self.assertIn('SUMMARY:Manicure', body)
+        response = self.client.get(self.feed_url(), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_reset_revokes_issued_urls(self):
+        url = self.feed_url()
+        self.client.force_login(self.user)
+        self.client.post(reverse('calendar_feed_reset'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(self.feed_url()).status_code, 200)
+
+    def test_salon_feed_requires_a_current_admin(self):
+        admins = Group.objects.create(name='Admin')
+        self.user.groups.add(admins)
+        url = self.feed_url('salon')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.user.groups.remove(admins)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.feed_url()).status_code, 404)
+
+    def test_salon_feed_requires_working_at_the_salon(self):
+        self.user.groups.add(Group.objects.create(name='Admin'))
+        salon_a = Salon.objects.create(name='Salon A', slug='salon-a')
+        salon_b = Salon.objects.create(name='Salon B', slug='salon-b')
+        salon_a.staff.add(self.user)
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get('/s/salon-a/dashboard/'), 'Salon calendar for staff')
+        self.assertNotContains(self.client.get('/s/salon-b/dashboard/'), 'Salon calendar for staff')
+        token = make_feed_token(self.user, 'salon', salon_b)
+        self.assertEqual(self.client.get(f"/s/salon-b{reverse('calendar_feed', args=[token])}").status_code, 404)
+        salon_b.staff.add(self.user)
+        self.assertEqual(self.client.get(f"/s/salon-b{reverse('calendar_feed', args=[token])}").status_code, 200)
@@ -0,0 +1,145 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+RATE_PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+def client_ip(request):
+    """
+    Returns the IP address of the client that sent a request.
+
+    Behind ``TRUSTED_PROXIES`` reverse proxies (load balancers), ``REMOTE_ADDR`` is the
+    address of the last proxy, so the client address is read from ``X-Forwarded-For``,
+    where each proxy appends the address it received the request from. Entries added
+    before the first trusted proxy are ignored, as the client may forge them.
+    """
+    proxies = settings.TRUSTED_PROXIES
+    if proxies:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR')
+
+
+def parse_rate(rate):
+    """
+    Parses a rate such as ``'10/m'``.
+
+    Args:
+        rate (str): A number of requests per second (``s``), minute (``m``), hour (``h``) or day (``d``).
+
+    Returns:
+        tuple: The bucket capacity and the number of tokens refilled per second.
+    """
+    requests, period = rate.split('/')
+    requests = int(requests)
+    return requests, requests / RATE_PERIODS[period[0]]
+
+
+def _take_token(bucket, capacity, refill_rate, now):
+    """
+    Refills a bucket for the time elapsed and takes one token from it.
+
+    Args:
+        bucket (tuple | None): The ``(tokens, timestamp)`` state of the bucket, None for a new bucket.
+
+    Returns:
+        tuple: The new state of the bucket and the seconds to wait before retrying (0 if allowed).
+    """
+    tokens, stamp = bucket or (capacity, now)
+    tokens = min(capacity, tokens + (now - stamp) * refill_rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) / refill_rate
+
+
+class MemoryBucketStore:
+    """
+    Token buckets kept in the memory of the current process.
+
+    ``consume(key, ...)`` takes a token from one bucket; ``consume_all(keys, ...)`` takes one
+    from each bucket only if all of them have one, so a refused request spends nothing.
+    Both return the seconds to wait before retrying, 0 if the token was taken.
+
+    Each process enforces the limits on its own, so with N worker processes a client
+    may get up to N times the configured rate. Refilled buckets are pruned once the
+    store holds more than ``max_keys`` of them.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._full_at = {}
+        self._prune_above = max_keys
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate):
+        return self.consume_all([key], capacity, refill_rate)
+
+    def consume_all(self, keys, capacity, refill_rate):
+        now = time.monotonic()
+        with self._lock:
+            taken = [_take_token(self._buckets.get(key), capacity, refill_rate, now) for key in keys]
+            retry_after = max(retry for _, retry in taken)
+            if retry_after:
+                return retry_after
+            for key, (bucket, _) in zip(keys, taken):
+                self._buckets[key] = bucket
+                self._full_at[key] = now + (capacity - bucket[0]) / refill_rate
+            if len(self._buckets) > self._prune_above:
+                self._prune(now)
+        return 0
+
+    def _prune(self, now):
+        # A bucket that has refilled completely behaves exactly like a new one.
+        for key in [key for key, full_at in self._full_at.items() if full_at <= now]:
+            del self._buckets[key], self._full_at[key]
+        # Back off when most buckets are still in use so pruning stays amortized O(1).
+        self._prune_above = max(self.max_keys, len(self._buckets) * 2)
+
+
+class CacheBucketStore:
+    """
+    Token buckets kept in a Django cache shared by every process.
+    Same interface as ``MemoryBucketStore``.
+
+    The read-modify-write of a bucket is not atomic, so concurrent requests from the
+    same client may occasionally get one token more than the limit.
+    """
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def consume(self, key, capacity, refill_rate):
+        return self.consume_all([key], capacity, refill_rate)
+
+    def consume_all(self, keys, capacity, refill_rate):
+        keys = [f'throttle:{key}' for key in keys]
+        now = time.time()
+        buckets = self.cache.get_many(keys)
+        taken = [_take_token(buckets.get(key), capacity, refill_rate, now) for key in keys]
+        retry_after = max(retry for _, retry in taken)
+        if retry_after:
+            return retry_after
+        self.cache.set_many(
+            {key: bucket for key, (bucket, _) in zip(keys, taken)}, math.ceil(capacity / refill_rate) + 1
+        )
+        return 0
+
+
+_stores = {}
+
+
+def get_bucket_store():
+    """Returns the bucket store selected by ``THROTTLE_STORE``."""
+    name = settings.THROTTLE_STORE
+    if name not in _stores:
+        if name == 'memory':
+            _stores[name] = MemoryBucketStore()
+        else:
+            _stores[name] = CacheBucketStore(settings.THROTTLE_CACHE_ALIAS)
+    return _stores[name]
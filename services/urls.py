@@ -2,7 +2,8 @@ from django.urls import path
 from .views import (
     home, login_view, logout_view, client_dashboard,
     ServiceListView, ServiceCreateView, ServiceUpdateView,
-    appointment_create, payment_create
+    appointment_create, appointment_series_create, appointment_series_cancel, payment_create,
+    calendar_feed, calendar_feed_reset
 )
 
 urlpatterns = [
@@ -18,5 +19,11 @@ urlpatterns = [
     
     # Client routes
     path('services/<int:service_id>/book/', appointment_create, name='appointment_create'),
+    path('services/<int:service_id>/book/recurring/', appointment_series_create, name='appointment_series_create'),
+    path('appointments/<int:appointment_id>/cancel-series/', appointment_series_cancel, name='appointment_series_cancel'),
     path('appointments/<int:appointment_id>/pay/', payment_create, name='payment_create'),
+
+    # Calendar feeds (signed URLs)
+    path('calendar/<str:token>.ics', calendar_feed, name='calendar_feed'),
+    path('calendar/reset/', calendar_feed_reset, name='calendar_feed_reset'),
 ]
@@ -1,12 +1,26 @@
+from functools import wraps
+
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required, user_passes_test
+from django.core import signing
+from django.http import Http404, StreamingHttpResponse
+from django.views.decorators.http import condition
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.utils.decorators import method_decorator
 from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.views.decorators.http import require_POST
 from django.views import View
 from django.views.generic import ListView, DetailView
 from django.urls import reverse
-from .models import Service, Appointment, Payment
-from .forms import AppointmentForm, ServiceForm, PaymentForm
+from .models import Service, Appointment, Payment, create_recurring_series, find_conflicts
+from .forms import AppointmentForm, ServiceForm, PaymentForm, RecurringAppointmentForm
+from .forecasts import get_service_demand
+from .calendar_feeds import (
+    feed_queryset, feed_version, make_feed_token, read_feed_token, render_feed, revoke_feed_tokens,
+)
+from .catalog import get_catalog
+from .idempotency import idempotent
 # Login and logout views
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.forms import AuthenticationForm
@@ -30,11 +44,40 @@ def is_admin(user):
     return user.groups.filter(name='Admin').exists()
 
 
+def is_salon_admin(user, salon):
+    """
+    Check if the given user is an admin working at the given salon.
+
+    Without a salon (single-salon deployments), every admin manages the salon.
+
+    Args:
+        user (User): The user object to check.
+        salon (Salon): The salon of the request, if any.
+
+    Returns:
+        bool: True if the user may manage the salon, False otherwise.
+    """
+    return is_admin(user) and (salon is None or salon.has_staff(user))
+
+
+def salon_admin_required(view_func):
+    """
+    Decorator for views restricted to the admins of the request's salon (see ``is_salon_admin``).
+    Other users are redirected to the login page, like with ``user_passes_test``.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not is_salon_admin(request.user, getattr(request, 'salon', None)):
+            return redirect_to_login(request.get_full_path())
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+
 def home(request):
     """
     Renders the home page with a list of all services.
 
-    This view function retrieves all Service objects from the database
+    This view function retrieves all Service objects from the cached catalog
     and passes them to the 'home.html' template for rendering.
 
     Args:
@@ -44,17 +87,17 @@ def home(request):
         HttpResponse: The rendered 'home.html' template with the list of services.
 
     """
-    services = Service.objects.all()
+    services = get_catalog()
     return render(request, 'home.html', {'services': services})
 
 
 @method_decorator(login_required, name='dispatch')
-@method_decorator(user_passes_test(is_admin), name='dispatch')
+@method_decorator(salon_admin_required, name='dispatch')
 class ServiceListView(ListView):
     """
     View to list all services.
 
-    This view is restricted to admin users only. It retrieves all Service objects
+    This view is restricted to the admins of the salon. It retrieves all Service objects
     from the database and passes them to the 'service_list.html' template for rendering.
 
     Attributes:
@@ -68,12 +111,12 @@ class ServiceListView(ListView):
 
 
 @method_decorator(login_required, name='dispatch')
-@method_decorator(user_passes_test(is_admin), name='dispatch')
+@method_decorator(salon_admin_required, name='dispatch')
 class ServiceCreateView(View):
     """
     View to create a new service.
 
-    This view is restricted to admin users only. It handles both GET and POST requests
+    This view is restricted to the admins of the salon. It handles both GET and POST requests
     to display a form for creating a new Service and to process the form submission.
 
     Methods:
@@ -100,11 +143,11 @@ class ServiceCreateView(View):
 
 
 @method_decorator(login_required, name='dispatch')
-@method_decorator(user_passes_test(is_admin), name='dispatch')
+@method_decorator(salon_admin_required, name='dispatch')
 class ServiceUpdateView(View):
     """
     View for updating a service.
-    Requires user to be logged in and to pass an admin test.
+    Requires user to be logged in and to be an admin of the salon.
     """
 
     def get(self, request, pk):
@@ -132,27 +175,79 @@ class ServiceUpdateView(View):
 
 
 @login_required
+@idempotent
 def appointment_create(request, service_id):
     """
     View for creating a new appointment for a specific service.
     Requires the user to be logged in. If the request method is POST, validates the form
-    and saves the appointment. Redirects to the client dashboard on success.
+    and saves the appointment, unless it overlaps another appointment of the user (see
+    ``find_conflicts``). Redirects to the client dashboard on success.
+    The form shows the busiest hours of the service from the precomputed demand forecast.
     """
     service = get_object_or_404(Service, id=service_id)
     if request.method == 'POST':
         form = AppointmentForm(request.POST)
         if form.is_valid():
-            appointment = form.save(commit=False)
-            appointment.client = request.user
-            appointment.service = service
-            appointment.save()
-            messages.success(request, "Appointment booked successfully.")
-            return redirect('client_dashboard')
+            if find_conflicts(request.user, [form.cleaned_data['appointment_date']]):
+                form.add_error('appointment_date', "You already have an appointment at this time.")
+            else:
+                appointment = form.save(commit=False)
+                appointment.client = request.user
+                appointment.service = service
+                appointment.save()
+                messages.success(request, "Appointment booked successfully.")
+                return redirect('client_dashboard')
     else:
         form = AppointmentForm()
-    return render(request, 'appointment_form.html', {'form': form, 'service': service})
+    return render(request, 'appointment_form.html', {
+        'form': form, 'service': service, 'demand': get_service_demand(service.id),
+    })
 
 @login_required
+@idempotent
+def appointment_series_create(request, service_id):
+    """
+    View for booking a recurring series of appointments for a specific service.
+    Requires the user to be logged in. Books every free occurrence with its reservation payment
+    in one transaction and reports the dates that were skipped because the user already has an
+    appointment then.
+    """
+    service = get_object_or_404(Service, id=service_id)
+    if request.method == 'POST':
+        form = RecurringAppointmentForm(request.POST)
+        if form.is_valid():
+            try:
+                booking = create_recurring_series(request.user, service, **form.cleaned_data)
+            except ValidationError as error:
+                form.add_error(None, error)
+            else:
+                messages.success(request, f"Booked {len(booking.appointments)} appointments.")
+                if booking.conflicts:
+                    messages.warning(request, "Skipped dates when you already have an appointment: " + ", ".join(
+                        f"{conflict:%Y-%m-%d %H:%M}" for conflict in booking.conflicts
+                    ))
+                return redirect('client_dashboard')
+    else:
+        form = RecurringAppointmentForm()
+    return render(request, 'appointment_series_form.html', {'form': form, 'service': service})
+
+
+@login_required
+@require_POST
+def appointment_series_cancel(request, appointment_id):
+    """
+    View for canceling an appointment of a recurring series and all the following ones.
+    Only the client who booked the series may cancel it. Redirects to the client dashboard.
+    """
+    appointment = get_object_or_404(
+        Appointment, id=appointment_id, client=request.user, series__isnull=False
+    )
+    canceled = appointment.series.cancel_from(appointment.appointment_date)
+    messages.success(request, f"Canceled {canceled} appointments.")
+    return redirect('client_dashboard')
+
+@login_required
+@idempotent
 def payment_create(request, appointment_id):
     """
     View for processing payment for a specific appointment.
@@ -179,11 +274,76 @@ def client_dashboard(request):
     View for displaying the client's dashboard with their appointments.
     Fetches all appointments for the logged-in user that are not deleted,
     ordered by appointment date in descending order.
+    Also links the user's calendar feed, and the salon's calendar feed for the salon's admins.
+    The feed URLs stay valid until the user resets them (see ``calendar_feed_reset``).
     """
     appointments = Appointment.objects.filter(client=request.user, is_deleted=False).order_by('-appointment_date')
-    return render(request, 'client_dashboard.html', {'appointments': appointments})
+    salon = getattr(request, 'salon', None)
+    context = {
+        'appointments': appointments,
+        'calendar_feed_url': request.build_absolute_uri(
+            reverse('calendar_feed', args=[make_feed_token(request.user, 'user', salon)])
+        ),
+    }
+    if is_salon_admin(request.user, salon):
+        context['salon_calendar_feed_url'] = request.build_absolute_uri(
+            reverse('calendar_feed', args=[make_feed_token(request.user, 'salon', salon)])
+        )
+    return render(request, 'client_dashboard.html', context)
+
+
+def _calendar_feed(request, token):
+    """Returns the feed reference and appointments of a calendar feed request, once per request."""
+    if not hasattr(request, '_calendar_feed'):
+        try:
+            feed = read_feed_token(token)
+        except signing.BadSignature:
+            raise Http404("Unknown calendar feed.")
+        salon = getattr(request, 'salon', None)
+        if feed['salon'] != (salon and salon.pk):
+            raise Http404("Unknown calendar feed.")
+        # The salon feed is only served while the user it was issued to is still an admin of the salon.
+        if feed['kind'] == 'salon' and not is_salon_admin(feed['owner'], salon):
+            raise Http404("Unknown calendar feed.")
+        queryset = feed_queryset(feed)
+        # Bind the database now: the feed is streamed after the tenant context has ended.
+        queryset = queryset.using(queryset.db)
+        request._calendar_feed = (feed, queryset, *feed_version(queryset))
+    return request._calendar_feed
+
+
+@condition(
+    etag_func=lambda request, token: _calendar_feed(request, token)[2],
+    last_modified_func=lambda request, token: _calendar_feed(request, token)[3],
+)
+def calendar_feed(request, token):
+    """
+    View serving the iCalendar feed of a client or of a salon, through a signed URL.
+    Calendar apps poll feeds every few minutes, so the ETag and Last-Modified headers are
+    derived from one aggregate query and unchanged feeds get a 304 without being rendered.
+    The events are streamed from an iterator so memory use stays flat.
+    """
+    feed, queryset, etag, last_modified = _calendar_feed(request, token)
+    name = 'My appointments' if feed['kind'] == 'user' else 'Salon appointments'
+    response = StreamingHttpResponse(
+        render_feed(queryset, name, request.get_host().split(':')[0], with_client=feed['kind'] == 'salon'),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['Content-Disposition'] = 'inline; filename="appointments.ics"'
+    return response
 
 
+@login_required
+@require_POST
+def calendar_feed_reset(request):
+    """
+    View for revoking every calendar feed URL issued to the logged-in user.
+    New URLs are shown on the client dashboard, where it redirects.
+    """
+    revoke_feed_tokens(request.user)
+    messages.success(request, "Your calendar links were reset. Subscribe again with the new links.")
+    return redirect('client_dashboard')
+
 
 def login_view(request):
     """
@@ -0,0 +1,125 @@
+import logging
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.urls import get_resolver, resolve
+
+from .catalog import prime_catalog
+from .models import Salon
+from .tenancy import tenant_context
+
+logger = logging.getLogger(__name__)
+
+WarmupReport = namedtuple('WarmupReport', ['timings', 'failures'])
+
+# The report of the last warm-up of this process, None until ``warm_up`` has run.
+last_report = None
+
+
+class WarmupError(Exception):
+    """Raised by a warm-up step that only partly succeeded."""
+
+
+def resolve_urls():
+    """Populate the URL resolver so the first request doesn't pay for it."""
+    resolver = get_resolver()
+    # Accessing the reverse dictionaries builds them for every included URLconf.
+    resolver.reverse_dict
+    resolver.namespace_dict
+    resolver.app_dict
+    resolve('/')
+
+
+def compile_templates():
+    """
+    Compiles every project template into the cached template loader.
+
+    Only templates living under ``BASE_DIR`` are compiled; the admin templates
+    shipped with Django are left for the admin to load on demand. A template that
+    fails to compile is logged and skipped, so it doesn't keep the others cold.
+
+    Returns:
+        int: The number of templates compiled.
+
+    Raises:
+        WarmupError: If some templates failed to compile, after compiling the others.
+    """
+    base_dir = str(settings.BASE_DIR)
+    compiled, failed = 0, []
+    for engine in engines.all():
+        for template_dir in engine.template_dirs:
+            template_dir = Path(template_dir)
+            if not str(template_dir).startswith(base_dir) or not template_dir.is_dir():
+                continue
+            for path in template_dir.rglob('*.html'):
+                name = path.relative_to(template_dir).as_posix()
+                try:
+                    engine.get_template(name)
+                except Exception:
+                    logger.exception("Could not compile template %r", name)
+                    failed.append(name)
+                else:
+                    compiled += 1
+    if failed:
+        raise WarmupError(f"{len(failed)} templates failed to compile: {', '.join(sorted(failed))}")
+    return compiled
+
+
+def open_connections():
+    """Opens a connection to every configured database."""
+    for alias in connections:
+        connections[alias].ensure_connection()
+
+
+def prime_catalogs():
+    """
+    Caches the catalog of every salon, as its requests will read it.
+
+    Without salons, the single catalog of the deployment is cached instead.
+    """
+    for salon in list(Salon.objects.all()) or [None]:
+        with tenant_context(salon):
+            prime_catalog()
+
+
+WARMUP_STEPS = [
+    ('urls', resolve_urls),
+    ('templates', compile_templates),
+    ('connections', open_connections),
+    ('catalog', prime_catalogs),
+]
+
+
+def warm_up():
+    """
+    Prepares a freshly started worker before it accepts traffic.
+
+    Each step is best effort: a failure is logged and the remaining steps still run,
+    so a worker never refuses to start because of the warm-up. The report is also
+    kept in ``last_report`` for ``startup_profile``.
+
+    Returns:
+        WarmupReport: The duration of each step in milliseconds and the error of each
+        failed step, both keyed by step name.
+    """
+    global last_report
+    timings, failures = {}, {}
+    for name, step in WARMUP_STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as error:
+            logger.exception("Warm-up step %r failed", name)
+            failures[name] = f'{type(error).__name__}: {error}'
+        timings[name] = (time.perf_counter() - start) * 1000
+    logger.info(
+        "Worker warm-up finished: %s%s",
+        ", ".join(f"{name}={ms:.1f}ms" for name, ms in timings.items()),
+        f" (failed: {', '.join(failures)})" if failures else "",
+    )
+    last_report = WarmupReport(timings, failures)
+    return last_report